@@ -0,0 +1,104 @@
+# ==========================================
+# 직전 등급별 점수 집계 (grade_aggregates 테이블)
+# ==========================================
+# (subject, round, prev_grade) -> total_sum, total_cnt
+# 제출이 바뀔 때마다 이전 값은 빼고 새 값은 더해서, 등급컷 예측이
+# submissions 전체를 읽지 않고 숫자 다섯 쌍만 읽으면 되게 한다.
+# client 는 supabase Client 또는 같은 체인을 흉내 내는 대역이면 된다.
+import threading
+from fetch import fetch_all
+
+AGG_TABLE = "grade_aggregates"
+GRADES = (1, 2, 3, 4, 5)
+
+# (과목, 회차) 락: 제출 쓰기와 그 delta, 전체 재집계가 서로 끼지 않게 한다 (같은 스레드에서 다시 잡을 수 있게 RLock)
+_locks = {}
+_locks_guard = threading.Lock()
+
+def _lock_for(sub_name, round_num):
+    with _locks_guard:
+        return _locks.setdefault((sub_name, round_num), threading.RLock())
+
+def empty_aggregates():
+    return {g: (0.0, 0) for g in GRADES}
+
+def _entry(row):
+    if not row or row.get('total') is None or row.get('prev_grade') not in GRADES: return None
+    return int(row['prev_grade']), float(row['total'])
+
+def apply_delta(aggs, old_row, new_row):
+    for row, sign in ((old_row, -1), (new_row, 1)):
+        e = _entry(row)
+        if e is None: continue
+        s, c = aggs[e[0]]
+        aggs[e[0]] = (s + sign * e[1], c + sign)
+    return aggs
+
+def compute_aggregates(rows):
+    aggs = empty_aggregates()
+    for r in rows: apply_delta(aggs, None, r)
+    return aggs
+
+def from_rows(agg_rows):
+    aggs = empty_aggregates()
+    for r in agg_rows:
+        if r['prev_grade'] in GRADES: aggs[r['prev_grade']] = (float(r['total_sum']), int(r['total_cnt']))
+    return aggs
+
+# ----------------------------------
+# DB 입출력
+# ----------------------------------
+def load_aggregates(client, sub_name, round_num):
+    # 아직 한 번도 집계되지 않았으면 None
+    res = client.table(AGG_TABLE).select("prev_grade, total_sum, total_cnt").eq("subject", sub_name).eq("round", round_num).execute()
+    if not res.data: return None
+    return from_rows(res.data)
+
+def load_aggregates_many(client, sub_names, round_num):
+    # 여러 과목을 한 번에 읽는다: {과목: 집계}. 한 번도 집계되지 않은 과목은 빠진다
+    res = client.table(AGG_TABLE).select("subject, prev_grade, total_sum, total_cnt").in_("subject", list(sub_names)).eq("round", round_num).execute()
+    by_sub = {}
+    for r in res.data: by_sub.setdefault(r['subject'], []).append(r)
+    return {sub: from_rows(rows) for sub, rows in by_sub.items()}
+
+def save_aggregates(client, sub_name, round_num, aggs):
+    rows = [{"subject": sub_name, "round": round_num, "prev_grade": g, "total_sum": aggs[g][0], "total_cnt": aggs[g][1]} for g in GRADES]
+    client.table(AGG_TABLE).upsert(rows, on_conflict="subject,round,prev_grade").execute()
+
+def record_change(client, sub_name, round_num, old_row, new_row):
+    if _entry(old_row) == _entry(new_row): return None
+    with _lock_for(sub_name, round_num):
+        aggs = load_aggregates(client, sub_name, round_num)
+        if aggs is None: return rebuild_aggregates(client, sub_name, round_num)
+        apply_delta(aggs, old_row, new_row)
+        save_aggregates(client, sub_name, round_num, aggs)
+        return aggs
+
+def write_submission(client, row):
+    # 제출 행을 쓰고 집계에 반영한다 -> (저장돼 있던 행, 새 집계 또는 None)
+    # 빼야 할 이전 값은 폼을 그릴 때의 행이 아니라 락 안에서 다시 읽은 행이다
+    # (폼을 연 뒤 재채점이 들어오거나 같은 답안을 두 번 제출해도 집계가 어긋나지 않게)
+    sub_name, round_num = row['subject'], row['round']
+    with _lock_for(sub_name, round_num):
+        res = client.table("submissions").select("total, prev_grade").eq("username", row['username']).eq("subject", sub_name).eq("round", round_num).execute()
+        old_row = res.data[0] if res.data else None
+        client.table("submissions").upsert(row).execute()
+        try: return old_row, record_change(client, sub_name, round_num, old_row, row)
+        except Exception:
+            # 집계 테이블을 쓰지 못해도 제출은 저장됐다 (예측은 스냅샷에서 계산)
+            return old_row, None
+
+def rebuild_aggregates(client, sub_name, round_num):
+    with _lock_for(sub_name, round_num):
+        rows = fetch_all(client, "submissions", "username, total, prev_grade", {"subject": sub_name, "round": round_num})
+        aggs = compute_aggregates(rows)
+        save_aggregates(client, sub_name, round_num, aggs)
+        return aggs
+
+def check_aggregates(client, sub_name, round_num, tol=1e-6):
+    # 저장된 집계와 전체 재계산 결과를 비교해 어긋난 등급만 돌려준다: {등급: (저장값, 재계산값)}
+    stored = load_aggregates(client, sub_name, round_num) or empty_aggregates()
+    rows = fetch_all(client, "submissions", "username, total, prev_grade", {"subject": sub_name, "round": round_num})
+    fresh = compute_aggregates(rows)
+    return {g: (stored[g], fresh[g]) for g in GRADES
+            if stored[g][1] != fresh[g][1] or abs(stored[g][0] - fresh[g][0]) > tol}
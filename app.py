@@ -1,77 +1,151 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import json
+import copy
+import time
+import threading
+import os
+import tempfile
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
 import plotly.graph_objects as go
 from supabase import create_client, Client
+import engine
+from engine import SUBJECT_CONFIG, GRADE_SUBJECTS
+import aggregates
+from fetch import fetch_all
+import export
+import snapshots
+import snapcache
+from snapcache import SnapshotCache, SNAPSHOT_FIELDS
+import localdb
+import perf
 
 # ==========================================
 # 0. 기본 설정
 # ==========================================
 st.set_page_config(page_title="재현고 내신 등급컷 예측 시스템", page_icon="📈")
 
+# LOCAL_DB=1 이면 메모리 DB(localdb)로, LOCAL_DB=mirror 이면 Supabase 의 로컬 미러로 동작 (그 밖의 값은 Supabase 그대로)
+# PERF=1 이면 DB 호출마다 시간/행 수를 잰다 (관리자 '성능' 탭)
 @st.cache_resource
 def init_supabase():
+    mode = os.environ.get("LOCAL_DB")
     try:
+        if mode == "1": return perf.instrument(localdb.from_env())
         if "SUPABASE_URL" in st.secrets and "SUPABASE_KEY" in st.secrets:
-            return create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
+            client = create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
+            return perf.instrument(localdb.from_env(upstream=client) if mode == "mirror" else client)
         return None
     except:
         return None
 
 supabase = init_supabase()
 
-# 과목 데이터
-SUBJECT_CONFIG = {
-    "국어(1학년)": {"obj": 24, "sub": 6}, "영어(1학년)": {"obj": 22, "sub": 5}, "수학(1학년)": {"obj": 17, "sub": 5},
-    "통합사회": {"obj": 24, "sub": 6}, "통합과학": {"obj": 22, "sub": 5}, "한국사": {"obj": 20, "sub": 8},
-    "대수": {"obj": 17, "sub": 5}, "미적분1": {"obj": 17, "sub": 5}, "확률과 통계": {"obj": 17, "sub": 5},
-    "수학과제탐구": {"obj": 17, "sub": 5}, "국어(2학년)": {"obj": 24, "sub": 6}, "영어(2학년)": {"obj": 22, "sub": 8},
-    "물리": {"obj": 20, "sub": 6}, "화학": {"obj": 20, "sub": 6}, "생물": {"obj": 20, "sub": 6}, "지구": {"obj": 20, "sub": 6},
-    "사회문화": {"obj": 20, "sub": 8}, "윤리": {"obj": 25, "sub": 5}, "지리": {"obj": 20, "sub": 6}, "역사": {"obj": 20, "sub": 6},
-    "중국어": {"obj": 28, "sub": 0}, "일본어": {"obj": 28, "sub": 0},
-    "독서와 작문": {"obj": 24, "sub": 6}, "영어 독해와 작문": {"obj": 22, "sub": 8}, "전문 수학": {"obj": 17, "sub": 5},
-    "언어생활탐구": {"obj": 24, "sub": 6}, "경제수학": {"obj": 17, "sub": 5}, "미적분2": {"obj": 17, "sub": 5},
-    "심화 영어": {"obj": 22, "sub": 8}, "경제": {"obj": 20, "sub": 8}, "한국지리 탐구": {"obj": 20, "sub": 6},
-    "동아시아 역사 기행": {"obj": 20, "sub": 6}, "윤리와 사상": {"obj": 25, "sub": 5}, "전자기와 양자": {"obj": 20, "sub": 6},
-    "화학 반응의 세계": {"obj": 19, "sub": 6}, "생물의 유전": {"obj": 20, "sub": 6}, "행성우주과학": {"obj": 20, "sub": 6}
-}
-
-GRADE_SUBJECTS = {
-    "1학년": ["국어(1학년)", "영어(1학년)", "수학(1학년)", "통합사회", "통합과학", "한국사"],
-    "2학년": ["대수", "미적분1", "확률과 통계", "수학과제탐구", "국어(2학년)", "영어(2학년)", "물리", "화학", "생물", "지구", "사회문화", "윤리", "지리", "역사", "중국어", "일본어"],
-    "3학년": ["독서와 작문", "영어 독해와 작문", "전문 수학", "언어생활탐구", "경제수학", "미적분2", "심화 영어", "경제", "한국지리 탐구", "동아시아 역사 기행", "윤리와 사상", "전자기와 양자", "화학 반응의 세계", "생물의 유전", "행성우주과학"]
-}
+# ----------------------------------
+# 제출 스냅샷 캐시 (프로세스 공용, snapcache.py)
+# ----------------------------------
+@st.cache_resource
+def get_snapshot_cache():
+    return SnapshotCache()
+
+snap_cache = get_snapshot_cache()
+
+# ----------------------------------
+# 설정 캐시 (subject_settings / system_config)
+# ----------------------------------
+# 설정은 시험 기간에 몇 번 안 바뀌므로 프로세스마다 들고 있는다.
+# SETTINGS_PROBE_SEC 마다 system_config 의 버전 행만 읽어 보고, 바뀌었으면 전부 버린다.
+# 저장할 때 버전을 올리므로 다른 프로세스도 최대 SETTINGS_PROBE_SEC 안에 새 설정을 본다.
+SETTINGS_PROBE_SEC = 5
+SETTINGS_VERSION_KEY = "settings_version"
+
+class SettingsCache:
+    def __init__(self, probe_sec=SETTINGS_PROBE_SEC):
+        self.probe_sec = probe_sec
+        self.version = None
+        self._next_probe = 0.0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, probe):
+        self._maybe_probe(probe)
+        with self._lock:
+            if key in self._entries: return copy.deepcopy(self._entries[key])
+            version = self.version
+        value = loader()
+        with self._lock:
+            # 읽는 도중 버전이 바뀌었으면 저장하지 않는다
+            if version == self.version: self._entries[key] = value
+        return copy.deepcopy(value)
+
+    def get_many(self, keys, loader, probe):
+        # 없는 키만 loader(없는 키 목록) 한 번으로 읽는다 -> {키: 값}
+        self._maybe_probe(probe)
+        with self._lock:
+            out = {k: self._entries[k] for k in keys if k in self._entries}
+            version = self.version
+        missing = [k for k in keys if k not in out]
+        if missing:
+            loaded = loader(missing)
+            with self._lock:
+                if version == self.version: self._entries.update(loaded)
+            out.update(loaded)
+        return copy.deepcopy(out)
+
+    def _maybe_probe(self, probe):
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_probe: return
+            self._next_probe = now + self.probe_sec
+        try: v = probe()
+        except: return
+        with self._lock:
+            if v != self.version:
+                self.version = v
+                self._entries.clear()
+
+    def reset(self, version):
+        with self._lock:
+            self.version = version
+            self._entries.clear()
+
+@st.cache_resource
+def get_settings_cache():
+    return SettingsCache()
+
+settings_cache = get_settings_cache()
+
+def probe_settings_version():
+    res = supabase.table("system_config").select("value").eq("key", SETTINGS_VERSION_KEY).execute()
+    return res.data[0]['value'] if res.data else None
+
+def bump_settings_version():
+    version = {"v": time.time_ns()}
+    supabase.table("system_config").upsert({"key": SETTINGS_VERSION_KEY, "value": version}).execute()
+    settings_cache.reset(version)
 
 # ----------------------------------
 # DB 헬퍼 함수
 # ----------------------------------
 def get_sys_config():
-    if not supabase: return {"current_round": 1, "exam_closed": False, "term_end_mode": False}
-    try:
+    default = {"current_round": 1, "exam_closed": False, "term_end_mode": False}
+    if not supabase: return default
+    def load():
         res = supabase.table("system_config").select("value").eq("key", "config").execute()
-        if res.data: 
-            conf = res.data[0]['value']
-            if "term_end_mode" not in conf: conf["term_end_mode"] = False
-            return conf
-    except: pass
-    return {"current_round": 1, "exam_closed": False, "term_end_mode": False}
+        conf = res.data[0]['value'] if res.data else default
+        if "term_end_mode" not in conf: conf["term_end_mode"] = False
+        return conf
+    try: return settings_cache.get(("config",), load, probe_settings_version)
+    except: return default
 
 def save_sys_config(conf):
     if supabase:
         supabase.table("system_config").upsert({"key": "config", "value": conf}).execute()
+        bump_settings_version()
 
-def get_subject_setting(sub, round_num):
-    if not supabase: return {}
-    try:
-        res = supabase.table("subject_settings").select("settings").eq("subject", sub).eq("round", round_num).execute()
-        if res.data: 
-            s = res.data[0]['settings']
-            if "term_mid_cuts" not in s: s["term_mid_cuts"] = {"1": 90.0, "2": 80.0, "3": 70.0}
-            if "term_adj" not in s or isinstance(s["term_adj"], float):
-                s["term_adj"] = {"1": 0.0, "2": 0.0, "3": 0.0}
-            return s
-    except: pass
-    
+def default_subject_setting(sub):
     conf = SUBJECT_CONFIG.get(sub, {"obj": 20, "sub": 0})
     return {
         "active": False, 
@@ -85,77 +159,409 @@ def get_subject_setting(sub, round_num):
         "term_adj": {"1": 0.0, "2": 0.0, "3": 0.0}
     }
 
+def fill_setting_defaults(s):
+    # 예전에 저장된 설정에 없는 학기말 항목 채우기
+    if "term_mid_cuts" not in s: s["term_mid_cuts"] = {"1": 90.0, "2": 80.0, "3": 70.0}
+    if "term_adj" not in s or isinstance(s["term_adj"], float):
+        s["term_adj"] = {"1": 0.0, "2": 0.0, "3": 0.0}
+    return s
+
+def get_subject_setting(sub, round_num):
+    if not supabase: return {}
+    def load():
+        res = supabase.table("subject_settings").select("settings").eq("subject", sub).eq("round", round_num).execute()
+        if not res.data: return default_subject_setting(sub)
+        return fill_setting_defaults(res.data[0]['settings'])
+    try: return settings_cache.get((sub, round_num), load, probe_settings_version)
+    except: return default_subject_setting(sub)
+
+def get_subject_settings(subs, round_num):
+    # 여러 과목 설정: 캐시에 없는 과목만 subject_settings 한 번(in_)으로 읽는다 -> {과목: 설정}
+    if not supabase: return {sub: {} for sub in subs}
+    def load(keys):
+        res = supabase.table("subject_settings").select("subject, settings").in_("subject", [k[0] for k in keys]).eq("round", round_num).execute()
+        found = {r['subject']: fill_setting_defaults(r['settings']) for r in res.data}
+        return {k: found.get(k[0]) or default_subject_setting(k[0]) for k in keys}
+    try: got = settings_cache.get_many([(sub, round_num) for sub in subs], load, probe_settings_version)
+    except: return {sub: default_subject_setting(sub) for sub in subs}
+    return {sub: got[(sub, round_num)] for sub in subs}
+
+def save_subject_setting(sub, round_num, d):
+    supabase.table("subject_settings").upsert({"subject": sub, "round": round_num, "settings": d}).execute()
+    bump_settings_version()
+
+@st.cache_resource
+def get_sync_state():
+    return snapcache.new_sync_state()
+
+sync_state = get_sync_state()
+
+def get_snapshot(sub_name, round_num):
+    return snap_cache.get((sub_name, round_num), lambda: snapcache.load_snapshot(supabase, sub_name, round_num, sync_state),
+                          lambda snap: snapcache.refresh_snapshot(supabase, snap, sub_name, round_num, sync_state))
+
+def record_submission(sub_name, round_num, username, fields):
+    # 캐시에 올라와 있으면 해당 행만 갱신 (없으면 다음 조회 때 새로 읽음). 스냅샷 컬럼이 없으면 그대로 둔다
+    fields = {k: v for k, v in fields.items() if k in SNAPSHOT_FIELDS}
+    snap = snap_cache.peek((sub_name, round_num)) if fields else None
+    if snap is not None: snap.merge(username, fields)
+
+def invalidate_submissions(sub_name, round_num):
+    snap_cache.invalidate((sub_name, round_num))
+    snap_cache.invalidate(("agg", sub_name, round_num))
+
+def get_aggregates(sub_name, round_num):
+    # 스냅샷이 올라와 있으면 그 안에서 행과 함께 갱신되는 집계를 쓴다
+    snap = snap_cache.peek((sub_name, round_num))
+    if snap is not None: return snap.aggregates()
+    def load():
+        try:
+            return aggregates.load_aggregates(supabase, sub_name, round_num) or aggregates.rebuild_aggregates(supabase, sub_name, round_num)
+        except:
+            # 집계 테이블이 없으면 스냅샷에서 직접 계산
+            return aggregates.compute_aggregates(get_snapshot(sub_name, round_num).values())
+    return snap_cache.get(("agg", sub_name, round_num), load)
+
+def get_aggregates_many(subs, round_num):
+    # 여러 과목 집계: 캐시에 없는 과목만 grade_aggregates 한 번(in_)으로 읽는다 -> {과목: 집계}
+    out, missing = {}, []
+    for sub in subs:
+        snap = snap_cache.peek((sub, round_num))
+        aggs = snap.aggregates() if snap is not None else snap_cache.peek(("agg", sub, round_num))
+        if aggs is not None: out[sub] = aggs
+        else: missing.append(sub)
+    if missing:
+        try: loaded = aggregates.load_aggregates_many(supabase, missing, round_num)
+        except: loaded = {}
+        for sub, aggs in loaded.items(): snap_cache.put(("agg", sub, round_num), aggs)
+        out.update(loaded)
+        # 아직 집계 행이 없는 과목만 하나씩 (처음 한 번 재집계)
+        for sub in missing:
+            if sub not in out: out[sub] = get_aggregates(sub, round_num)
+    return out
+
+def save_submission(sub_name, round_num, username, new_row):
+    # 저장돼 있던 행과의 차이로 집계를 갱신한다 (aggregates.write_submission 참고)
+    _, aggs = aggregates.write_submission(supabase, new_row)
+    record_submission(sub_name, round_num, username, new_row)
+    if aggs is not None: snap_cache.put(("agg", sub_name, round_num), aggs)
+
+# ----------------------------------
+# 일괄 재채점 (정답/배점 수정 시)
+# ----------------------------------
+REGRADE_BATCH = 500
+
+def regrade_submissions(sub_name, round_num, d):
+    rows = fetch_all(supabase, "submissions", "username, total, marks, sub_vals", {"subject": sub_name, "round": round_num})
+    rows = [r for r in rows if r.get('total') is not None and r.get('marks') is not None]
+    if not rows: return 0, 0, 0.0
+
+    t0 = time.perf_counter()
+    marks = engine.pack_matrix((r['marks'] for r in rows), len(d["obj_answers"]), np.uint8)
+    sub_vals = engine.pack_matrix((r.get('sub_vals') for r in rows), len(d["sub_max_scores"]), np.float64)
+    new_total = engine.score_batch(marks, sub_vals, d)
+    old_total = np.array([r['total'] for r in rows], dtype=np.float64)
+    changed = np.flatnonzero(~np.isclose(new_total, old_total))
+    elapsed = (time.perf_counter() - t0) * 1000
+
+    updates = [{"username": rows[i]['username'], "subject": sub_name, "round": round_num, "total": float(new_total[i])} for i in changed]
+    for i in range(0, len(updates), REGRADE_BATCH):
+        supabase.table("submissions").upsert(updates[i:i + REGRADE_BATCH], on_conflict="username,subject,round").execute()
+    if updates:
+        invalidate_submissions(sub_name, round_num)
+        try: aggregates.rebuild_aggregates(supabase, sub_name, round_num)
+        except: pass
+    return len(rows), len(updates), elapsed
+
+# ----------------------------------
+# 문항 분석 (정답 + 데이터 버전별 캐시)
+# ----------------------------------
+# 정답과 제출 스냅샷 version 이 키에 들어가므로, 정답을 고치거나 답안이 바뀌면 다음 분석은 새로 계산된다.
+# 제출 스냅샷 캐시와는 따로 둔다 (학생의 새로고침에 쓸려 나가거나 스냅샷 자리를 차지하지 않게).
+ITEM_TTL = 3600
+
+@st.cache_resource
+def get_item_cache():
+    return SnapshotCache(ttl=ITEM_TTL)
+
+item_cache = get_item_cache()
+
+def get_item_analysis(sub_name, round_num, d):
+    version = get_snapshot(sub_name, round_num).version
+    def load():
+        rows = [r for r in fetch_all(supabase, "submissions", "username, total, marks", {"subject": sub_name, "round": round_num})
+                if r.get('total') is not None and r.get('marks') is not None]
+        t0 = time.perf_counter()
+        marks = engine.pack_matrix((r['marks'] for r in rows), len(d["obj_answers"]), np.uint8)
+        totals = np.array([r['total'] for r in rows], dtype=np.float64)
+        stats = engine.item_analysis(marks, totals, d["obj_answers"])
+        return stats, len(rows), (time.perf_counter() - t0) * 1000
+    return item_cache.get((sub_name, round_num, tuple(d["obj_answers"]), version), load)
+
+# ----------------------------------
+# 실제 등급 확정 (일괄 저장)
+# ----------------------------------
+# 과목마다 조회 + update/insert 하던 것(1 + 2N회)을 users 갱신 1회 + submissions upsert 1회로 줄인다.
+# 확정 등급은 회차 스냅샷(round_results)에도 같은 방식으로 합친다.
+def confirm_final_grades(username, round_num, new_pg, confirmed_round):
+    supabase.table("users").update({"prev_grades": new_pg, "last_confirmed_round": confirmed_round}).eq("username", username).execute()
+    if round_num < 1 or not new_pg: return
+    # final_grade 는 제출 스냅샷에 없는 컬럼이라 스냅샷은 건드리지 않는다
+    rows = [{"username": username, "subject": sub, "round": round_num, "final_grade": grade} for sub, grade in new_pg.items()]
+    supabase.table("submissions").upsert(rows, on_conflict="username,subject,round").execute()
+    try: snapshots.record_final_grades(supabase, username, round_num, new_pg)
+    except: pass
+
+# ----------------------------------
+# 회차 결과 스냅샷 (채점 종료 / 새 시험 시작 때)
+# ----------------------------------
+def freeze_round(round_num):
+    # -> (과목 수, 결과 행 수). 실패하면 예외를 그대로 올린다 (관리자 화면에서 보여주고, 그 회차 성적표는 실시간 계산)
+    return snapshots.materialize_round(supabase, round_num, lambda sub: get_subject_setting(sub, round_num))
+
 # ----------------------------------
 # 예측 및 랭킹 알고리즘
 # ----------------------------------
-def get_prediction(sub_name, round_num):
-    d = get_subject_setting(sub_name, round_num)
-    res = supabase.table("submissions").select("total, prev_grade").eq("subject", sub_name).eq("round", round_num).execute()
-    df = pd.DataFrame(res.data)
+def get_prediction(sub_name, round_num, d=None):
+    if d is None: d = get_subject_setting(sub_name, round_num)
+    return engine.predict_cuts(d, get_aggregates(sub_name, round_num))
+
+def get_predictions(subs, round_num):
+    # 성적표용: 여러 과목의 예측을 설정 한 번, 집계 한 번 읽어서 같이 계산 -> {과목: (실시간, 호머, 인원, 호머 여부)}
+    subs = list(dict.fromkeys(subs))
+    if not subs: return {}
+    ds, aggs = get_subject_settings(subs, round_num), get_aggregates_many(subs, round_num)
+    return {sub: engine.predict_cuts(ds[sub], aggs[sub]) for sub in subs}
+
+def get_term_prediction(sub_name, round_num, current_exam_cuts, d=None):
+    if d is None: d = get_subject_setting(sub_name, round_num)
+    return engine.predict_term_cuts(d, current_exam_cuts)
+
+# 부트스트랩 등급컷 구간: 집계(=데이터 버전)와 설정이 같으면 한 번 계산한 것을 모든 세션이 같이 쓴다
+BAND_TTL = 3600
+
+@st.cache_resource
+def get_band_cache():
+    return SnapshotCache(ttl=BAND_TTL)
+
+band_cache = get_band_cache()
+
+def get_prediction_bands(sub_name, round_num, d=None):
+    if d is None: d = get_subject_setting(sub_name, round_num)
+    snap = get_snapshot(sub_name, round_num)
+    version = (tuple(sorted(snap.aggregates().items())), json.dumps(d, sort_keys=True))
+    def load():
+        rows = [r for r in snap.values() if r.get('total') is not None and r.get('prev_grade') is not None]
+        return engine.bootstrap_cuts(d, np.array([r['total'] for r in rows], dtype=np.float64), np.array([r['prev_grade'] for r in rows], dtype=np.int64))
+    return band_cache.get((sub_name, round_num, version), load)
+
+def get_my_rank(sub_name, my_score, round_num):
+    return get_snapshot(sub_name, round_num).rank(my_score)
+
+def get_my_term_rank(sub_name, my_term_total, round_num):
+    return get_snapshot(sub_name, round_num).term_rank(round(my_term_total, 2))
+
+# ----------------------------------
+# 학생 화면 (과목 탭 / 학기말 / 성적표 조각)
+# ----------------------------------
+# 탭은 선택된 것만 실행하고, 각 탭은 st.fragment 라서 안에서 누른 버튼/폼은 그 탭만 다시 그린다.
+# 과목 탭의 동시 조회는 프로세스 공용 풀 하나에서 돈다 (세션 수와 상관없이 PREFETCH_WORKERS 개까지).
+# 여기서 부르는 fetch_all 의 페이지는 fetch 모듈의 풀에서 받으므로 두 풀이 서로를 기다리지 않는다.
+PREFETCH_WORKERS = 8
+
+@st.cache_resource
+def get_prefetch_pool():
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+prefetch_pool = get_prefetch_pool()
+
+def prefetch_subject_view(username, sub, round_num):
+    # 설정(캐시)을 먼저 보고, 공개 과목이면 내 제출과 스냅샷을 동시에 받는다 (예측은 스냅샷 안의 집계로 계산)
+    d = get_subject_setting(sub, round_num)
+    if not d.get("active"): return {"d": d}
+    def load_mine():
+        res = supabase.table("submissions").select("*").eq("username", username).eq("subject", sub).eq("round", round_num).execute()
+        return res.data[0] if res.data else None
+    futs = [prefetch_pool.submit(contextvars.copy_context().run, fn, *args)
+            for fn, args in ((load_mine, ()), (get_snapshot, (sub, round_num)))]
+    wait(futs)
+    row = futs[0].result()
+    view = {"d": d, "row": row}
+    if row is not None:
+        view["pred"] = get_prediction(sub, round_num, d)
+        view["rank"] = get_my_rank(sub, row['total'], round_num)
+    return view
+
+# 버튼/폼 콜백: 조각이 다시 그려지기 전에 실행되므로 따로 st.rerun 할 필요가 없다
+def start_edit(sub):
+    st.session_state[f"ed_{sub}"] = True
+
+def submit_answers(user, sub, cur_round, d):
+    ss = st.session_state
+    marks = [ss[f"m_{sub}_{idx}"] for idx in range(SUBJECT_CONFIG[sub]["obj"])]
+    sub_vals = [ss[f"s_{sub}_{k}"] for k in range(SUBJECT_CONFIG[sub]["sub"])]
+    new_row = {"username":user, "subject":sub, "round":cur_round, "total":engine.score_submission(marks, sub_vals, d), "prev_grade":ss.prev_grades[sub], "marks":marks, "sub_vals":sub_vals}
+    save_submission(sub, cur_round, user, new_row)
+    ss[f"ed_{sub}"] = False
+
+def save_term_scores(user, sub, cur_round):
+    fields = {"mid_score": st.session_state[f"im_{sub}"], "perf_score": st.session_state[f"ip_{sub}"]}
+    supabase.table("submissions").update(fields).eq("username", user).eq("subject", sub).eq("round", cur_round).execute()
+    record_submission(sub, cur_round, user, fields)
+    st.session_state[f"term_saved_{sub}"] = True
+
+@st.fragment
+@perf.timed("tab", lambda user, sub, *a: sub)
+def subject_tab(user, sub, cur_round, sys_conf):
+    if sys_conf["exam_closed"]: st.info("⛔ 채점이 종료되었습니다. 성적표 탭에서 실제 등급을 입력하세요."); return
+    view = prefetch_subject_view(user, sub, cur_round)
+    d = view["d"]
+    if not d.get("active"): st.warning("비공개 상태"); return
     
-    if df.empty: 
-        raw_cuts = d["prev_cuts"]
-    else:
-        g_avgs = {}
-        for g in range(1, 6):
-            target = df[df['prev_grade'] == g]
-            g_avgs[g] = target['total'].mean() if not target.empty else float(d["dev_predict"][str(g)])
-        cur_avg = (g_avgs[1]*0.1 + g_avgs[2]*0.24 + g_avgs[3]*0.32 + g_avgs[4]*0.24 + g_avgs[5]*0.1)
-        delta = cur_avg - d["prev_avg"]
-        raw_cuts = {g: round(d["prev_cuts"][g] + (delta * d["cut_weights"][g]), 1) for g in ["1", "2", "3"]}
+    row = view["row"]
+    is_sub, edit_mode = row is not None, st.session_state.get(f"ed_{sub}", False)
     
-    homer_cuts = raw_cuts.copy()
-    if d.get("homer_mode", False):
-        adj = d["homer_adj"]
-        homer_cuts = {
-            "1": raw_cuts["1"] + adj["1"], "2": raw_cuts["2"] + adj["2"], "3": raw_cuts["3"] + adj["3"]
-        }
-        is_homer = True
-    else:
-        is_homer = False
+    if is_sub and not edit_mode:
+        raw, homer, cnt, is_h = view["pred"]
+        rank, tied, tot = view["rank"]
+        
+        rank_msg = f"{rank}등 / {tot}명"
+        if tied > 1: rank_msg = f"{rank}등 (동점 {tied}명) / {tot}명"
         
-    return raw_cuts, homer_cuts, len(df), is_homer
+        st.info(f"🏆 점수: {row['total']}점 ({rank_msg})")
+        # 예측 범위: 제출을 재표본해서 얻은 90% 구간 (제출이 적을 때 컷이 얼마나 흔들리는지)
+        bands = get_prediction_bands(sub, cur_round, d) if st.checkbox("📉 예측 범위 보기 (90% 구간)", key=f"band_{sub}") else None
+        fmt = lambda cuts, b, g: f"{cuts[g]} ({b[g][0]}~{b[g][1]})" if b else f"{cuts[g]}"
+        raw_b, homer_b = bands or (None, None)
+        c1, c2 = st.columns(2)
+        c1.success(f"📊 실시간 컷\n1등급: {fmt(raw, raw_b, '1')}\n2등급: {fmt(raw, raw_b, '2')}\n3등급: {fmt(raw, raw_b, '3')}")
+        if is_h: c2.error(f"😈 호머 컷\n1등급: {fmt(homer, homer_b, '1')}\n2등급: {fmt(homer, homer_b, '2')}\n3등급: {fmt(homer, homer_b, '3')}")
+        
+        target = homer if is_h else raw
+        steps = [{'range': [0, target['3']], 'color': "#ffdede"}, {'range': [target['3'], target['2']], 'color': "#fff5de"}, {'range': [target['2'], target['1']], 'color': "#deffde"}, {'range': [target['1'], 100], 'color': "#e5deff"}]
+        target_b = homer_b if is_h else raw_b
+        if target_b: steps += [{'range': list(target_b[g]), 'color': "rgba(80, 80, 80, 0.25)"} for g in ["1", "2", "3"]]
+        fig = go.Figure(go.Indicator(mode="gauge+number", value=row['total'], gauge={'axis': {'range': [0, 100]}, 'steps': steps}))
+        st.plotly_chart(fig, use_container_width=True)
 
-def get_term_prediction(sub_name, round_num, current_exam_cuts):
-    d = get_subject_setting(sub_name, round_num)
-    mid_cuts = d.get("term_mid_cuts", {"1": 90, "2": 80, "3": 70})
-    adj = d.get("term_adj", {"1": 0.0, "2": 0.0, "3": 0.0})
-    if isinstance(adj, float): adj = {"1": adj, "2": adj, "3": adj}
+        st.button("수정", key=f"re_{sub}", on_click=start_edit, args=(sub,))
 
-    term_cuts = {}
-    for g in ["1", "2", "3"]:
-        final_cut = current_exam_cuts[g]
-        val = (final_cut * 0.3) + (mid_cuts[g] * 0.3) + 40 + adj[g]
-        term_cuts[g] = round(val, 2)
-    return term_cuts
+        # [학기말 모드 표시]
+        if sys_conf["term_end_mode"]: term_block(user, sub, cur_round, d, target)
 
-def get_my_rank(sub_name, my_score, round_num):
-    res = supabase.table("submissions").select("total").eq("subject", sub_name).eq("round", round_num).execute()
-    valid_scores = [r['total'] for r in res.data if r['total'] is not None]
-    scores = sorted(valid_scores, reverse=True)
-    try: 
-        rank = scores.index(my_score) + 1
-        tied = scores.count(my_score)
-        return rank, tied, len(scores)
-    except: 
-        return 0, 0, len(scores)
+    else:
+        with st.form(f"f_{sub}"):
+            prev = row if is_sub else {}
+            def_m = prev.get('marks', [1]*SUBJECT_CONFIG[sub]["obj"])
+            def_s = prev.get('sub_vals', [0.0]*SUBJECT_CONFIG[sub]["sub"])
+            st.write("#### 객관식")
+            for idx in range(SUBJECT_CONFIG[sub]["obj"]):
+                st.columns(6)[idx%6].selectbox(f"{idx+1}",[1,2,3,4,5],index=int(def_m[idx])-1, key=f"m_{sub}_{idx}")
+            
+            if SUBJECT_CONFIG[sub]["sub"] > 0:
+                st.write("#### 서술형")
+                for k in range(SUBJECT_CONFIG[sub]["sub"]):
+                    st.number_input(f"서술{k+1} (기준:{d['sub_criteria'][k]})", 0.0, d['sub_max_scores'][k], float(def_s[k]), key=f"s_{sub}_{k}")
+            
+            st.form_submit_button("제출", on_click=submit_answers, args=(user, sub, cur_round, d))
 
-def get_my_term_rank(sub_name, my_term_total, round_num):
-    res = supabase.table("submissions").select("total, mid_score, perf_score").eq("subject", sub_name).eq("round", round_num).execute()
-    term_scores = []
-    for r in res.data:
-        if r['total'] is not None and r.get('mid_score') is not None and r.get('perf_score') is not None:
-            score = (r['total'] * 0.3) + (r['mid_score'] * 0.3) + r['perf_score']
-            term_scores.append(round(score, 2))
+@st.fragment
+@perf.timed("tab", lambda user, sub, *a: f"{sub} 학기말")
+def term_block(user, sub, cur_round, d, target):
+    # 점수는 공유 스냅샷에서 읽는다 (저장하면 바로 반영되므로 다시 조회할 필요 없음)
+    row = get_snapshot(sub, cur_round).row(user) or {}
+    st.divider()
+    st.subheader("💯 학기말 최종 등급 예측")
+    st.caption("중간고사 점수와 수행평가 점수를 입력하세요.")
     
-    term_scores.sort(reverse=True)
-    try:
-        my_val = round(my_term_total, 2)
-        rank = term_scores.index(my_val) + 1
-        tied = term_scores.count(my_val)
-        return rank, tied, len(term_scores)
-    except:
-        return 0, 0, len(term_scores)
+    prev_mid = row.get('mid_score') or 0.0
+    prev_perf = row.get('perf_score') or 0.0
+    
+    with st.form(f"term_{sub}"):
+        c_t1, c_t2 = st.columns(2)
+        c_t1.number_input("중간고사 점수", 0.0, 100.0, float(prev_mid), key=f"im_{sub}")
+        c_t2.number_input("수행평가 (40점 만점)", 0.0, 40.0, float(prev_perf), key=f"ip_{sub}")
+        
+        st.form_submit_button("결과 확인", on_click=save_term_scores, args=(user, sub, cur_round))
+    # 콜백 안에서는 요소를 그리지 않는다 (조각 재실행 때 화면 맨 위에 붙음)
+    if st.session_state.pop(f"term_saved_{sub}", False): st.toast("저장됨")
+    
+    if row.get('mid_score') is not None and row.get('total') is not None:
+        term_cuts = get_term_prediction(sub, cur_round, target, d)
+        my_term_score = round((row['total']*0.3) + (row['mid_score']*0.3) + row['perf_score'], 2)
+        
+        t_rank, t_tied, t_tot = get_my_term_rank(sub, my_term_score, cur_round)
+        t_rank_msg = f"{t_rank}등 / {t_tot}명"
+        if t_tied > 1: t_rank_msg = f"{t_rank}등 (동점 {t_tied}명) / {t_tot}명"
+        
+        if my_term_score >= term_cuts['1']: t_grade = "1등급"
+        elif my_term_score >= term_cuts['2']: t_grade = "2등급"
+        elif my_term_score >= term_cuts['3']: t_grade = "3등급"
+        else: t_grade = "4등급 이하"
+        
+        st.markdown(f"""
+        <div style="background-color:#f0f2f6; padding:15px; border-radius:10px;">
+            <h4>🏁 학기말 예측: <span style="color:blue">{t_grade}</span></h4>
+            <p>환산 점수: <b>{my_term_score}점</b> (석차: {t_rank_msg})</p>
+            <small>1컷: {term_cuts['1']} / 2컷: {term_cuts['2']} / 3컷: {term_cuts['3']}</small>
+        </div>
+        """, unsafe_allow_html=True)
+
+@st.fragment
+@perf.timed("tab", "종합 성적표")
+def report_tab(user, my_subs, cur_round, sys_conf):
+    st.header("📋 종합 성적표")
+    view_round = st.selectbox("회차 선택", range(cur_round, 0, -1))
+    
+    if sys_conf["exam_closed"] and view_round == cur_round:
+        st.write("📢 실제 등급을 입력하여 다음 예측 정확도를 높이세요.")
+        with st.form("real_grade"):
+            new_pg = {}
+            for s in my_subs:
+                default_val = st.session_state.prev_grades.get(s, 5)
+                val = st.number_input(f"{s} 확정 등급 (1~9)", 1, 9, int(default_val), key=f"real_{s}")
+                new_pg[s] = min(5, val)
+            
+            if st.form_submit_button("저장"):
+                confirm_final_grades(user, cur_round, new_pg, sys_conf["current_round"])
+                st.session_state.prev_grades = new_pg; st.success("저장됨"); st.balloons()
+    else:
+        # 지난 회차는 얼려 둔 결과를 그대로 보여준다 (스냅샷이 없을 때만 실시간 계산)
+        frozen = []
+        if view_round < cur_round:
+            try: frozen = snapshots.load_results(supabase, user, view_round)
+            except: frozen = []
+        if frozen:
+            rows = []
+            for r in frozen:
+                if r.get('final_grade'): grade_display = f"{r['final_grade']}등급 (확정)"
+                elif r.get('grade'): grade_display = f"{r['grade']}등급 (예측)"
+                else: continue
+                score_display = f"{r['total']}점" if r.get('total') is not None else "-"
+                rows.append({"과목":r['subject'], "점수":score_display, "등급":grade_display})
+            if rows: st.table(pd.DataFrame(rows))
+            else: st.info("기록이 없습니다.")
+            return
+        res = supabase.table("submissions").select("subject, total, final_grade").eq("username", user).eq("round", view_round).execute()
+        # 예측이 필요한 과목은 한꺼번에 계산
+        preds = get_predictions([r['subject'] for r in res.data if not r.get('final_grade') and r['total'] is not None], view_round)
+        rows = []
+        for r in res.data:
+            final_g = r.get('final_grade')
+            if final_g:
+                grade_display = f"{final_g}등급 (확정)"
+                score_display = f"{r['total']}점" if r['total'] is not None else "-"
+            else:
+                if r['total'] is not None:
+                    raw, homer, _, is_h = preds[r['subject']]
+                    cuts = homer if is_h else raw
+                    grade_val = engine.grade_for(r['total'], cuts)
+                    grade_display = f"{grade_val}등급 (예측)"
+                    score_display = f"{r['total']}점"
+                else: continue
+            rows.append({"과목":r['subject'], "점수":score_display, "등급":grade_display})
+        if rows: st.table(pd.DataFrame(rows))
+        else: st.info("기록이 없습니다.")
 
 # 세션 초기화
 if "init" not in st.session_state:
@@ -169,315 +575,287 @@ if "init" not in st.session_state:
 # 페이지 라우팅
 # ==========================================
 
-# 1. 로그인
-if st.session_state.page == "login":
-    st.title("📈 재현고 내신 등급컷 예측 시스템")
-    t1, t2 = st.tabs(["로그인", "회원가입"])
-    with t1:
-        lid = st.text_input("ID", key="l_id"); lpw = st.text_input("PW", type="password", key="l_pw")
-        if st.button("로그인"):
-            if not supabase: st.error("DB 연결 실패"); st.stop()
-            res = supabase.table("users").select("*").eq("username", lid).execute()
-            if res.data and str(res.data[0]["password"]) == str(lpw):
-                u = res.data[0]
-                sys_conf = get_sys_config()
-                st.session_state.update({"user": lid, "role": u["role"], "grade": u["grade"], "prev_grades": u["prev_grades"]})
-                
-                last_conf = u.get("last_confirmed_round", 1)
-                curr_round = sys_conf["current_round"]
-                if curr_round > 1 and last_conf < curr_round: st.session_state.page = "update_grades"
-                else: st.session_state.page = "main"
-                st.rerun()
-            else: st.error("로그인 실패")
-    with t2:
-        if st.session_state.signup_step == 1:
-            st.session_state.signup_info["grade"] = st.radio("학년", ["1학년", "2학년", "3학년"], key="su_g")
-            if st.button("다음"): st.session_state.signup_step = 2; st.rerun()
-        elif st.session_state.signup_step == 2:
-            s_n = st.text_input("닉네임"); s_p = st.text_input("비번", type="password")
-            gr = st.session_state.signup_info["grade"]
-            subs = GRADE_SUBJECTS.get(gr, [])
-            sel = st.multiselect("수강 과목", subs)
-            pg = {s: min(5, st.number_input(f"{s} 직전 등급 (1~5)", 1, 5, 3, key=f"p_{s}")) for s in sel}
-            if st.button("가입"):
+# 페이지마다 한 구간. st.rerun / st.stop 은 예외로 빠져나가므로 finally 에서 닫는다 (그 렌더도 기록된다)
+route = st.session_state.page
+page = perf.begin("page", ("admin" if st.session_state.role == "admin" else "student") if route == "main" else route)
+try:
+    # 1. 로그인
+    if st.session_state.page == "login":
+        st.title("📈 재현고 내신 등급컷 예측 시스템")
+        t1, t2 = st.tabs(["로그인", "회원가입"])
+        with t1:
+            lid = st.text_input("ID", key="l_id"); lpw = st.text_input("PW", type="password", key="l_pw")
+            if st.button("로그인"):
                 if not supabase: st.error("DB 연결 실패"); st.stop()
-                chk = supabase.table("users").select("username").eq("username", s_n).execute()
-                if chk.data: st.error("이미 사용 중인 아이디입니다.")
-                else:
+                res = supabase.table("users").select("*").eq("username", lid).execute()
+                if res.data and str(res.data[0]["password"]) == str(lpw):
+                    u = res.data[0]
                     sys_conf = get_sys_config()
-                    supabase.table("users").insert({"username": s_n, "password": s_p, "role": "user", "grade": gr, "prev_grades": pg, "last_confirmed_round": sys_conf["current_round"]}).execute()
-                    st.session_state.signup_step = 1; st.success("가입 완료!"); st.rerun()
-
-# 2. 등급 강제 업데이트
-elif st.session_state.page == "update_grades":
-    sys_conf = get_sys_config()
-    st.title("🆙 이전 시험 등급 확정")
-    st.warning(f"📢 현재 **{sys_conf['current_round']}회차** 시험 기간입니다.\n정확한 등급 예측을 위해 **직전 시험의 실제 등급**을 입력해야 넘어갈 수 있습니다.")
-    with st.form("force_update_form"):
-        new_pg = {}
-        current_subs = list(st.session_state.prev_grades.keys())
-        for s in current_subs:
-            val = st.number_input(f"{s} 성적표 등급 (1~9)", 1, 9, 3, key=f"up_{s}")
-            new_pg[s] = min(5, val)
-        if st.form_submit_button("✅ 저장하고 메인으로 이동"):
-            supabase.table("users").update({"prev_grades": new_pg, "last_confirmed_round": sys_conf["current_round"]}).eq("username", st.session_state.user).execute()
-            last_round = sys_conf["current_round"] - 1
-            if last_round > 0:
-                for sub, grade in new_pg.items():
-                    chk = supabase.table("submissions").select("*").eq("username", st.session_state.user).eq("subject", sub).eq("round", last_round).execute()
-                    if chk.data: supabase.table("submissions").update({"final_grade": grade}).eq("username", st.session_state.user).eq("subject", sub).eq("round", last_round).execute()
-                    else: supabase.table("submissions").insert({"username": st.session_state.user, "subject": sub, "round": last_round, "total": None, "final_grade": grade}).execute()
-            st.session_state.prev_grades = new_pg; st.session_state.page = "main"; st.success("업데이트 완료!"); st.rerun()
-
-elif st.session_state.page == "main":
-    user, role = st.session_state.user, st.session_state.role
-    sys_conf = get_sys_config()
-    cur_round = sys_conf["current_round"]
+                    st.session_state.update({"user": lid, "role": u["role"], "grade": u["grade"], "prev_grades": u["prev_grades"]})
+                
+                    last_conf = u.get("last_confirmed_round", 1)
+                    curr_round = sys_conf["current_round"]
+                    if curr_round > 1 and last_conf < curr_round: st.session_state.page = "update_grades"
+                    else: st.session_state.page = "main"
+                    st.rerun()
+                else: st.error("로그인 실패")
+        with t2:
+            if st.session_state.signup_step == 1:
+                st.session_state.signup_info["grade"] = st.radio("학년", ["1학년", "2학년", "3학년"], key="su_g")
+                if st.button("다음"): st.session_state.signup_step = 2; st.rerun()
+            elif st.session_state.signup_step == 2:
+                s_n = st.text_input("닉네임"); s_p = st.text_input("비번", type="password")
+                gr = st.session_state.signup_info["grade"]
+                subs = GRADE_SUBJECTS.get(gr, [])
+                sel = st.multiselect("수강 과목", subs)
+                pg = {s: min(5, st.number_input(f"{s} 직전 등급 (1~5)", 1, 5, 3, key=f"p_{s}")) for s in sel}
+                if st.button("가입"):
+                    if not supabase: st.error("DB 연결 실패"); st.stop()
+                    chk = supabase.table("users").select("username").eq("username", s_n).execute()
+                    if chk.data: st.error("이미 사용 중인 아이디입니다.")
+                    else:
+                        sys_conf = get_sys_config()
+                        supabase.table("users").insert({"username": s_n, "password": s_p, "role": "user", "grade": gr, "prev_grades": pg, "last_confirmed_round": sys_conf["current_round"]}).execute()
+                        st.session_state.signup_step = 1; st.success("가입 완료!"); st.rerun()
+
+    # 2. 등급 강제 업데이트
+    elif st.session_state.page == "update_grades":
+        sys_conf = get_sys_config()
+        st.title("🆙 이전 시험 등급 확정")
+        st.warning(f"📢 현재 **{sys_conf['current_round']}회차** 시험 기간입니다.\n정확한 등급 예측을 위해 **직전 시험의 실제 등급**을 입력해야 넘어갈 수 있습니다.")
+        with st.form("force_update_form"):
+            new_pg = {}
+            current_subs = list(st.session_state.prev_grades.keys())
+            for s in current_subs:
+                val = st.number_input(f"{s} 성적표 등급 (1~9)", 1, 9, 3, key=f"up_{s}")
+                new_pg[s] = min(5, val)
+            if st.form_submit_button("✅ 저장하고 메인으로 이동"):
+                confirm_final_grades(st.session_state.user, sys_conf["current_round"] - 1, new_pg, sys_conf["current_round"])
+                st.session_state.prev_grades = new_pg; st.session_state.page = "main"; st.success("업데이트 완료!"); st.rerun()
+
+    elif st.session_state.page == "main":
+        user, role = st.session_state.user, st.session_state.role
+        sys_conf = get_sys_config()
+        cur_round = sys_conf["current_round"]
     
-    st.sidebar.title(f"👤 {user}")
-    st.sidebar.info(f"현재 시험: {cur_round}회차")
-    if sys_conf["term_end_mode"]: st.sidebar.success("💯 학기말 모드 ON")
-    if st.sidebar.button("🔄 새로고침"): st.rerun()
-    if st.sidebar.button("로그아웃"): st.session_state.page = "login"; st.rerun()
-
-    if role == "admin":
-        st.header("🛠 관리자 모드")
-        t1, t2, t3 = st.tabs(["과목 설정", "시스템 설정", "데이터 추출"])
+        st.sidebar.title(f"👤 {user}")
+        st.sidebar.info(f"현재 시험: {cur_round}회차")
+        if sys_conf["term_end_mode"]: st.sidebar.success("💯 학기말 모드 ON")
+        if st.sidebar.button("🔄 새로고침"):
+            # 내 과목의 이번 회차만 (관리자는 전 과목)
+            subs = list(SUBJECT_CONFIG) if role == "admin" else list(st.session_state.prev_grades)
+            snap_cache.expire([k for sub in subs for k in ((sub, cur_round), ("agg", sub, cur_round))]); st.rerun()
+        if st.sidebar.button("로그아웃"): st.session_state.page = "login"; st.rerun()
+
+        if role == "admin":
+            st.header("🛠 관리자 모드")
+            t1, t2, t3, t4, t5 = st.tabs(["과목 설정", "시스템 설정", "데이터 추출", "문항 분석", "성능"])
         
-        with t1:
-            sel_sub = st.selectbox("과목 선택", list(SUBJECT_CONFIG.keys()))
-            d = get_subject_setting(sel_sub, cur_round)
-            st.write(f"### {cur_round}회차 {sel_sub} 설정")
-            c1, c2 = st.columns(2)
-            act = c1.checkbox("채점 활성화", value=d["active"], key=f"act_{sel_sub}")
-            hom = c2.checkbox("😈 호머 보정 켜기", value=d.get("homer_mode", False), key=f"hom_{sel_sub}")
+            with t1:
+                sel_sub = st.selectbox("과목 선택", list(SUBJECT_CONFIG.keys()))
+                d = get_subject_setting(sel_sub, cur_round)
+                st.write(f"### {cur_round}회차 {sel_sub} 설정")
+                c1, c2 = st.columns(2)
+                act = c1.checkbox("채점 활성화", value=d["active"], key=f"act_{sel_sub}")
+                hom = c2.checkbox("😈 호머 보정 켜기", value=d.get("homer_mode", False), key=f"hom_{sel_sub}")
             
-            # [수정] 관리자 입력 폼: 모든 number_input의 min/max 제한 제거 (value와 step만 사용)
-            with st.form(f"admin_f_{sel_sub}"):
-                d["active"] = act
-                d["homer_mode"] = hom
-                d["prev_avg"] = st.number_input("지난 평균", value=float(d["prev_avg"]), step=0.1, key=f"pa_{sel_sub}")
+                # [수정] 관리자 입력 폼: 모든 number_input의 min/max 제한 제거 (value와 step만 사용)
+                with st.form(f"admin_f_{sel_sub}"):
+                    d["active"] = act
+                    d["homer_mode"] = hom
+                    d["prev_avg"] = st.number_input("지난 평균", value=float(d["prev_avg"]), step=0.1, key=f"pa_{sel_sub}")
                 
-                st.divider()
-                st.markdown("#### 📅 학기말 예측 설정 (중간고사 컷 입력)")
-                tmc = st.columns(3)
-                d["term_mid_cuts"]["1"] = tmc[0].number_input("중간 1컷", value=float(d["term_mid_cuts"]["1"]), step=0.1, key=f"tm1_{sel_sub}")
-                d["term_mid_cuts"]["2"] = tmc[1].number_input("중간 2컷", value=float(d["term_mid_cuts"]["2"]), step=0.1, key=f"tm2_{sel_sub}")
-                d["term_mid_cuts"]["3"] = tmc[2].number_input("중간 3컷", value=float(d["term_mid_cuts"]["3"]), step=0.1, key=f"tm3_{sel_sub}")
+                    st.divider()
+                    st.markdown("#### 📅 학기말 예측 설정 (중간고사 컷 입력)")
+                    tmc = st.columns(3)
+                    d["term_mid_cuts"]["1"] = tmc[0].number_input("중간 1컷", value=float(d["term_mid_cuts"]["1"]), step=0.1, key=f"tm1_{sel_sub}")
+                    d["term_mid_cuts"]["2"] = tmc[1].number_input("중간 2컷", value=float(d["term_mid_cuts"]["2"]), step=0.1, key=f"tm2_{sel_sub}")
+                    d["term_mid_cuts"]["3"] = tmc[2].number_input("중간 3컷", value=float(d["term_mid_cuts"]["3"]), step=0.1, key=f"tm3_{sel_sub}")
                 
-                st.caption("등급별 변동 보정치 (음수 가능)")
-                tadj = st.columns(3)
-                d["term_adj"]["1"] = tadj[0].number_input("1컷 보정", value=float(d["term_adj"]["1"]), step=0.1, key=f"ta1_{sel_sub}")
-                d["term_adj"]["2"] = tadj[1].number_input("2컷 보정", value=float(d["term_adj"]["2"]), step=0.1, key=f"ta2_{sel_sub}")
-                d["term_adj"]["3"] = tadj[2].number_input("3컷 보정", value=float(d["term_adj"]["3"]), step=0.1, key=f"ta3_{sel_sub}")
-                st.divider()
+                    st.caption("등급별 변동 보정치 (음수 가능)")
+                    tadj = st.columns(3)
+                    d["term_adj"]["1"] = tadj[0].number_input("1컷 보정", value=float(d["term_adj"]["1"]), step=0.1, key=f"ta1_{sel_sub}")
+                    d["term_adj"]["2"] = tadj[1].number_input("2컷 보정", value=float(d["term_adj"]["2"]), step=0.1, key=f"ta2_{sel_sub}")
+                    d["term_adj"]["3"] = tadj[2].number_input("3컷 보정", value=float(d["term_adj"]["3"]), step=0.1, key=f"ta3_{sel_sub}")
+                    st.divider()
 
-                if hom:
-                    st.info("😈 호머 보정치")
-                    hc = st.columns(3)
-                    d["homer_adj"] = {
-                        "1": hc[0].number_input("1컷+", value=float(d["homer_adj"]["1"]), step=0.1, key=f"ha1_{sel_sub}"), 
-                        "2": hc[1].number_input("2컷+", value=float(d["homer_adj"]["2"]), step=0.1, key=f"ha2_{sel_sub}"), 
-                        "3": hc[2].number_input("3컷+", value=float(d["homer_adj"]["3"]), step=0.1, key=f"ha3_{sel_sub}")
-                    }
+                    if hom:
+                        st.info("😈 호머 보정치")
+                        hc = st.columns(3)
+                        d["homer_adj"] = {
+                            "1": hc[0].number_input("1컷+", value=float(d["homer_adj"]["1"]), step=0.1, key=f"ha1_{sel_sub}"), 
+                            "2": hc[1].number_input("2컷+", value=float(d["homer_adj"]["2"]), step=0.1, key=f"ha2_{sel_sub}"), 
+                            "3": hc[2].number_input("3컷+", value=float(d["homer_adj"]["3"]), step=0.1, key=f"ha3_{sel_sub}")
+                        }
                 
-                st.write("#### 1. 등급컷 기준 (W: 가중치, 전: 전년도)")
-                c = st.columns(3)
-                d["cut_weights"] = {
-                    "1": c[0].number_input("1W", value=float(d["cut_weights"]["1"]), step=0.01, key=f"cw1_{sel_sub}"),
-                    "2": c[1].number_input("2W", value=float(d["cut_weights"]["2"]), step=0.01, key=f"cw2_{sel_sub}"),
-                    "3": c[2].number_input("3W", value=float(d["cut_weights"]["3"]), step=0.01, key=f"cw3_{sel_sub}")
-                }
-                cc = st.columns(3)
-                d["prev_cuts"] = {
-                    "1": cc[0].number_input("전1컷", value=float(d["prev_cuts"]["1"]), step=0.1, key=f"pc1_{sel_sub}"),
-                    "2": cc[1].number_input("전2컷", value=float(d["prev_cuts"]["2"]), step=0.1, key=f"pc2_{sel_sub}"),
-                    "3": cc[2].number_input("전3컷", value=float(d["prev_cuts"]["3"]), step=0.1, key=f"pc3_{sel_sub}")
-                }
+                    st.write("#### 1. 등급컷 기준 (W: 가중치, 전: 전년도)")
+                    c = st.columns(3)
+                    d["cut_weights"] = {
+                        "1": c[0].number_input("1W", value=float(d["cut_weights"]["1"]), step=0.01, key=f"cw1_{sel_sub}"),
+                        "2": c[1].number_input("2W", value=float(d["cut_weights"]["2"]), step=0.01, key=f"cw2_{sel_sub}"),
+                        "3": c[2].number_input("3W", value=float(d["cut_weights"]["3"]), step=0.01, key=f"cw3_{sel_sub}")
+                    }
+                    cc = st.columns(3)
+                    d["prev_cuts"] = {
+                        "1": cc[0].number_input("전1컷", value=float(d["prev_cuts"]["1"]), step=0.1, key=f"pc1_{sel_sub}"),
+                        "2": cc[1].number_input("전2컷", value=float(d["prev_cuts"]["2"]), step=0.1, key=f"pc2_{sel_sub}"),
+                        "3": cc[2].number_input("전3컷", value=float(d["prev_cuts"]["3"]), step=0.1, key=f"pc3_{sel_sub}")
+                    }
                 
-                st.write("#### 2. 이번 시험 예상 평균")
-                gc = st.columns(5)
-                for i in range(1, 6): 
-                    d["dev_predict"][str(i)] = gc[i-1].number_input(f"{i}등급 평균", value=float(d["dev_predict"][str(i)]), step=0.1, key=f"dp_{i}_{sel_sub}")
-
-                st.write("#### 3. 정답 및 배점")
-                for i in range(0, SUBJECT_CONFIG[sel_sub]["obj"], 4):
-                    cols = st.columns(4)
-                    for j in range(4):
-                        idx = i+j
-                        if idx < SUBJECT_CONFIG[sel_sub]["obj"]:
-                            d["obj_answers"][idx] = cols[j].selectbox(f"Q{idx+1}", [1,2,3,4,5], index=d["obj_answers"][idx]-1, key=f"ans_{sel_sub}_{idx}")
-                            # [수정] 배점 제한 제거
-                            d["obj_scores"][idx] = cols[j].number_input(f"Q{idx+1}점", value=float(d["obj_scores"][idx]), step=0.1, key=f"sco_{sel_sub}_{idx}")
+                    st.write("#### 2. 이번 시험 예상 평균")
+                    gc = st.columns(5)
+                    for i in range(1, 6): 
+                        d["dev_predict"][str(i)] = gc[i-1].number_input(f"{i}등급 평균", value=float(d["dev_predict"][str(i)]), step=0.1, key=f"dp_{i}_{sel_sub}")
+
+                    st.write("#### 3. 정답 및 배점")
+                    for i in range(0, SUBJECT_CONFIG[sel_sub]["obj"], 4):
+                        cols = st.columns(4)
+                        for j in range(4):
+                            idx = i+j
+                            if idx < SUBJECT_CONFIG[sel_sub]["obj"]:
+                                d["obj_answers"][idx] = cols[j].selectbox(f"Q{idx+1}", [1,2,3,4,5], index=d["obj_answers"][idx]-1, key=f"ans_{sel_sub}_{idx}")
+                                # [수정] 배점 제한 제거
+                                d["obj_scores"][idx] = cols[j].number_input(f"Q{idx+1}점", value=float(d["obj_scores"][idx]), step=0.1, key=f"sco_{sel_sub}_{idx}")
                 
-                if SUBJECT_CONFIG[sel_sub]["sub"] > 0:
-                    st.write("#### 4. 서술형 설정")
-                    for k in range(SUBJECT_CONFIG[sel_sub]["sub"]):
-                        d["sub_criteria"][k] = st.text_input(f"서술{k+1}기준", d["sub_criteria"][k], key=f"scri_{sel_sub}_{k}")
-                        # [수정] 만점 제한 제거
-                        d["sub_max_scores"][k] = st.number_input(f"서술{k+1}만점", value=float(d["sub_max_scores"][k]), step=0.1, key=f"smax_{sel_sub}_{k}")
+                    if SUBJECT_CONFIG[sel_sub]["sub"] > 0:
+                        st.write("#### 4. 서술형 설정")
+                        for k in range(SUBJECT_CONFIG[sel_sub]["sub"]):
+                            d["sub_criteria"][k] = st.text_input(f"서술{k+1}기준", d["sub_criteria"][k], key=f"scri_{sel_sub}_{k}")
+                            # [수정] 만점 제한 제거
+                            d["sub_max_scores"][k] = st.number_input(f"서술{k+1}만점", value=float(d["sub_max_scores"][k]), step=0.1, key=f"smax_{sel_sub}_{k}")
                 
-                if st.form_submit_button("✅ 과목 설정 저장"):
-                    supabase.table("subject_settings").upsert({"subject": sel_sub, "round": cur_round, "settings": d}).execute()
-                    st.success("저장 완료!")
+                    if st.form_submit_button("✅ 과목 설정 저장"):
+                        save_subject_setting(sel_sub, cur_round, d)
+                        st.success("저장 완료!")
 
-        with t2:
-            with st.form("sys_form"):
-                st.write(f"현재 시험 회차: **{cur_round}회**")
-                col_sys1, col_sys2 = st.columns(2)
-                is_closed = col_sys1.checkbox("⛔ 채점 종료 (실제 등급 입력 모드)", value=sys_conf["exam_closed"])
-                is_term_mode = col_sys2.checkbox("💯 학기말 모드 켜기 (중간+기말+수행)", value=sys_conf["term_end_mode"])
+                st.caption("정답이나 배점을 고친 뒤 저장했다면, 이미 제출된 답안도 새 기준으로 다시 채점하세요.")
+                if st.button("🔁 전체 재채점", key=f"regrade_{sel_sub}"):
+                    n_all, n_changed, ms = regrade_submissions(sel_sub, cur_round, get_subject_setting(sel_sub, cur_round))
+                    st.success(f"{n_all}건 재채점 완료: 점수 변경 {n_changed}건 (계산 {ms:.1f}ms)")
+                if st.button("🧮 집계 점검", key=f"aggchk_{sel_sub}"):
+                    try:
+                        diff = aggregates.check_aggregates(supabase, sel_sub, cur_round)
+                        if diff:
+                            aggregates.rebuild_aggregates(supabase, sel_sub, cur_round)
+                            invalidate_submissions(sel_sub, cur_round)
+                            st.warning(f"집계 불일치 {len(diff)}개 등급을 재구성했습니다: {diff}")
+                        else: st.success("집계 일치")
+                    except Exception as e: st.error(f"집계 점검 실패: {e}")
+
+            with t2:
+                with st.form("sys_form"):
+                    st.write(f"현재 시험 회차: **{cur_round}회**")
+                    col_sys1, col_sys2 = st.columns(2)
+                    is_closed = col_sys1.checkbox("⛔ 채점 종료 (실제 등급 입력 모드)", value=sys_conf["exam_closed"])
+                    is_term_mode = col_sys2.checkbox("💯 학기말 모드 켜기 (중간+기말+수행)", value=sys_conf["term_end_mode"])
                 
-                if st.form_submit_button("설정 적용"):
-                    sys_conf["exam_closed"] = is_closed
-                    sys_conf["term_end_mode"] = is_term_mode
-                    save_sys_config(sys_conf)
-                    st.success("적용됨")
+                    if st.form_submit_button("설정 적용"):
+                        newly_closed = is_closed and not sys_conf["exam_closed"]
+                        sys_conf["exam_closed"] = is_closed
+                        sys_conf["term_end_mode"] = is_term_mode
+                        save_sys_config(sys_conf)
+                        st.success("적용됨")
+                        if newly_closed:
+                            try:
+                                frozen = freeze_round(cur_round)
+                                st.info(f"{cur_round}회차 스냅샷: {frozen[0]}과목 / {frozen[1]}건")
+                            except Exception as e: st.warning(f"{cur_round}회차 스냅샷 저장 실패 (새 시험 시작 때 다시 시도): {e}")
             
-            st.divider()
-            if st.button("🚀 새 시험 시작 (회차 증가)"):
-                sys_conf["current_round"] += 1
-                sys_conf["exam_closed"] = False
-                sys_conf["term_end_mode"] = False
-                save_sys_config(sys_conf)
-                st.success(f"{sys_conf['current_round']}회차 시험이 시작되었습니다!"); st.rerun()
-
-        with t3:
-            r_sel = st.number_input("추출할 회차", 1, cur_round, cur_round)
-            if st.button("데이터 추출"):
-                res = supabase.table("submissions").select("*").eq("round", r_sel).execute()
-                if res.data:
-                    df = pd.DataFrame(res.data)
-                    st.dataframe(df); st.download_button("다운로드", df.to_csv().encode('utf-8-sig'), f"round_{r_sel}.csv")
+                st.divider()
+                skip_freeze = st.checkbox("스냅샷 없이 시작 (스냅샷 저장이 실패할 때만)", key="skip_freeze")
+                if st.button("🚀 새 시험 시작 (회차 증가)"):
+                    # 지난 회차를 얼리지 못했으면 회차를 올리지 않는다 (관리자가 확인하고 다시 시도하거나, 알고서 건너뛴다)
+                    try: freeze_round(cur_round); frozen_err = None
+                    except Exception as e: frozen_err = e
+                    if frozen_err is not None and not skip_freeze:
+                        st.error(f"{cur_round}회차 스냅샷 저장 실패로 새 시험을 시작하지 않았습니다 (round_snapshots / round_results 테이블 확인): {frozen_err}")
+                    else:
+                        sys_conf["current_round"] += 1
+                        sys_conf["exam_closed"] = False
+                        sys_conf["term_end_mode"] = False
+                        save_sys_config(sys_conf)
+                        st.success(f"{sys_conf['current_round']}회차 시험이 시작되었습니다!"); st.rerun()
 
-    else:
-        # 학생 모드
-        my_subs = list(st.session_state.prev_grades.keys())
-        tabs = st.tabs(my_subs + ["종합 성적표"])
-        
-        for i, sub in enumerate(my_subs):
-            with tabs[i]:
-                if sys_conf["exam_closed"]: st.info("⛔ 채점이 종료되었습니다. 성적표 탭에서 실제 등급을 입력하세요."); continue
-                d = get_subject_setting(sub, cur_round)
-                if not d.get("active"): st.warning("비공개 상태"); continue
-                
-                my_sub = supabase.table("submissions").select("*").eq("username", user).eq("subject", sub).eq("round", cur_round).execute()
-                is_sub, edit_mode = len(my_sub.data) > 0, st.session_state.get(f"ed_{sub}", False)
-                
-                if is_sub and not edit_mode:
-                    row = my_sub.data[0]
-                    raw, homer, cnt, is_h = get_prediction(sub, cur_round)
-                    rank, tied, tot = get_my_rank(sub, row['total'], cur_round)
-                    
-                    rank_msg = f"{rank}등 / {tot}명"
-                    if tied > 1: rank_msg = f"{rank}등 (동점 {tied}명) / {tot}명"
-                    
-                    st.info(f"🏆 점수: {row['total']}점 ({rank_msg})")
-                    c1, c2 = st.columns(2)
-                    c1.success(f"📊 실시간 컷\n1등급: {raw['1']}\n2등급: {raw['2']}\n3등급: {raw['3']}")
-                    if is_h: c2.error(f"😈 호머 컷\n1등급: {homer['1']}\n2등급: {homer['2']}\n3등급: {homer['3']}")
-                    
-                    target = homer if is_h else raw
-                    fig = go.Figure(go.Indicator(mode="gauge+number", value=row['total'], gauge={'axis': {'range': [0, 100]}, 'steps': [{'range': [0, target['3']], 'color': "#ffdede"}, {'range': [target['3'], target['2']], 'color': "#fff5de"}, {'range': [target['2'], target['1']], 'color': "#deffde"}, {'range': [target['1'], 100], 'color': "#e5deff"}]}))
-                    st.plotly_chart(fig, use_container_width=True)
-
-                    if st.button("수정", key=f"re_{sub}"): st.session_state[f"ed_{sub}"] = True; st.rerun()
-
-                    # [학기말 모드 표시]
-                    if sys_conf["term_end_mode"]:
-                        st.divider()
-                        st.subheader("💯 학기말 최종 등급 예측")
-                        st.caption("중간고사 점수와 수행평가 점수를 입력하세요.")
-                        
-                        prev_mid = row.get('mid_score') or 0.0
-                        prev_perf = row.get('perf_score') or 0.0
-                        
-                        with st.form(f"term_{sub}"):
-                            c_t1, c_t2 = st.columns(2)
-                            in_mid = c_t1.number_input("중간고사 점수", 0.0, 100.0, float(prev_mid), key=f"im_{sub}")
-                            in_perf = c_t2.number_input("수행평가 (40점 만점)", 0.0, 40.0, float(prev_perf), key=f"ip_{sub}")
-                            
-                            if st.form_submit_button("결과 확인"):
-                                supabase.table("submissions").update({"mid_score": in_mid, "perf_score": in_perf}).eq("username", user).eq("subject", sub).eq("round", cur_round).execute()
-                                st.success("저장됨"); st.rerun()
-                        
-                        if row.get('mid_score') is not None:
-                            term_cuts = get_term_prediction(sub, cur_round, target)
-                            my_term_score = round((row['total']*0.3) + (row['mid_score']*0.3) + row['perf_score'], 2)
-                            
-                            t_rank, t_tied, t_tot = get_my_term_rank(sub, my_term_score, cur_round)
-                            t_rank_msg = f"{t_rank}등 / {t_tot}명"
-                            if t_tied > 1: t_rank_msg = f"{t_rank}등 (동점 {t_tied}명) / {t_tot}명"
-                            
-                            if my_term_score >= term_cuts['1']: t_grade = "1등급"
-                            elif my_term_score >= term_cuts['2']: t_grade = "2등급"
-                            elif my_term_score >= term_cuts['3']: t_grade = "3등급"
-                            else: t_grade = "4등급 이하"
-                            
-                            st.markdown(f"""
-                            <div style="background-color:#f0f2f6; padding:15px; border-radius:10px;">
-                                <h4>🏁 학기말 예측: <span style="color:blue">{t_grade}</span></h4>
-                                <p>환산 점수: <b>{my_term_score}점</b> (석차: {t_rank_msg})</p>
-                                <small>1컷: {term_cuts['1']} / 2컷: {term_cuts['2']} / 3컷: {term_cuts['3']}</small>
-                            </div>
-                            """, unsafe_allow_html=True)
+                st.divider()
+                st.caption("지난 회차 성적표는 회차 스냅샷에서 읽습니다. 스냅샷이 없는 회차는 여기서 만드세요.")
+                fc1, fc2 = st.columns(2)
+                f_round = fc1.number_input("스냅샷 회차", 1, cur_round, max(1, cur_round - 1), key="freeze_rnd")
+                if fc2.button("📸 스냅샷 다시 만들기"):
+                    try:
+                        frozen = freeze_round(int(f_round))
+                        st.success(f"{int(f_round)}회차 스냅샷: {frozen[0]}과목 / {frozen[1]}건")
+                    except Exception as e: st.error(f"스냅샷 저장 실패 (round_snapshots / round_results 테이블 확인): {e}")
+
+            with t3:
+                rc1, rc2 = st.columns(2)
+                r_from = rc1.number_input("시작 회차", 1, cur_round, cur_round)
+                r_to = rc2.number_input("끝 회차", 1, cur_round, cur_round)
+                ex_subs = st.multiselect("과목 (비우면 전체)", list(SUBJECT_CONFIG.keys()))
+                ex_cols = st.multiselect("컬럼", list(export.EXPORT_COLUMNS), default=list(export.EXPORT_COLUMNS))
+                fmts = ["CSV", "Parquet"] if export.parquet_available() else ["CSV"]
+                fc1, fc2 = st.columns(2)
+                ex_fmt = fc1.radio("형식", fmts, horizontal=True)
+                n_preview = fc2.number_input("미리보기 행 수", 0, 1000, 50)
+                if st.button("데이터 추출"):
+                    if not ex_cols or r_from > r_to: st.error("회차 범위와 컬럼을 확인하세요."); st.stop()
+                    preview = []
+                    rows = export.with_preview(export.export_rows(supabase, range(r_from, r_to + 1), ex_subs, ex_cols), n_preview, preview)
+                    ext = "csv" if ex_fmt == "CSV" else "parquet"
+                    fd, path = tempfile.mkstemp(suffix=f".{ext}")
+                    try:
+                        with os.fdopen(fd, "wb") as f:
+                            n_rows = export.write_csv(rows, f, ex_cols) if ext == "csv" else export.write_parquet(rows, f, ex_cols)
+                        if n_rows:
+                            st.caption(f"총 {n_rows}행 (앞 {len(preview)}행 미리보기)")
+                            st.dataframe(pd.DataFrame(preview, columns=ex_cols))
+                            with open(path, "rb") as f:
+                                st.download_button("다운로드", f, f"round_{r_from}-{r_to}.{ext}" if r_from != r_to else f"round_{r_from}.{ext}")
+                        else: st.info("추출할 데이터가 없습니다.")
+                    finally:
+                        os.remove(path)
 
+            with t4:
+                ic1, ic2 = st.columns(2)
+                ia_sub = ic1.selectbox("과목", list(SUBJECT_CONFIG.keys()), key="ia_sub")
+                ia_round = int(ic2.number_input("회차", 1, cur_round, cur_round, key="ia_round"))
+                if st.button("📊 문항 분석"):
+                    d_ia = get_subject_setting(ia_sub, ia_round)
+                    stats, n_ia, ms = get_item_analysis(ia_sub, ia_round, d_ia)
+                    if not n_ia: st.info("분석할 답안이 없습니다.")
+                    else:
+                        st.caption(f"응답 {n_ia}명 (계산 {ms:.1f}ms) · 변별도: 총점 상위 27% - 하위 27% 정답률, 점이연: 정답 여부와 총점의 상관")
+                        df = pd.DataFrame({"정답": d_ia["obj_answers"], "정답률": stats["p"].round(3), "변별도": stats["disc"].round(3),
+                                           "점이연": stats["pbis"].round(3), "상위 최다 선택": stats["top_pick"]}, index=pd.RangeIndex(1, len(stats["p"]) + 1, name="문항"))
+                        for c in range(engine.CHOICES): df[f"{c+1}번 선택"] = (stats["dist"][:, c] / n_ia).round(3)
+                        df["의심"] = np.where(stats["suspect"], "⚠", "")
+                        bad = [str(i + 1) for i in np.flatnonzero(stats["suspect"])]
+                        if bad: st.warning(f"정답 확인 필요: {', '.join(bad)}번 (변별도/점이연이 음수이거나 상위 집단이 다른 선택지를 가장 많이 고름)")
+                        st.dataframe(df)
+
+            with t5:
+                if not perf.ENABLED: st.info("PERF=1 환경 변수로 실행하면 DB 호출/페이지/탭 시간을 수집합니다.")
                 else:
-                    with st.form(f"f_{sub}"):
-                        prev = my_sub.data[0] if is_sub else {}
-                        def_m = prev.get('marks', [1]*SUBJECT_CONFIG[sub]["obj"])
-                        def_s = prev.get('sub_vals', [0.0]*SUBJECT_CONFIG[sub]["sub"])
-                        st.write("#### 객관식")
-                        marks = [st.columns(6)[idx%6].selectbox(f"{idx+1}",[1,2,3,4,5],index=int(def_m[idx])-1, key=f"m_{sub}_{idx}") for idx in range(SUBJECT_CONFIG[sub]["obj"])]
-                        
-                        sub_vals = []
-                        if SUBJECT_CONFIG[sub]["sub"] > 0:
-                            st.write("#### 서술형")
-                            for k in range(SUBJECT_CONFIG[sub]["sub"]):
-                                v = st.number_input(f"서술{k+1} (기준:{d['sub_criteria'][k]})", 0.0, d['sub_max_scores'][k], float(def_s[k]), key=f"s_{sub}_{k}")
-                                sub_vals.append(v)
-                        
-                        if st.form_submit_button("제출"):
-                            op = sum(d["obj_scores"][x] for x, m in enumerate(marks) if m==d["obj_answers"][x])
-                            supabase.table("submissions").upsert({"username":user, "subject":sub, "round":cur_round, "total":op+sum(sub_vals), "prev_grade":st.session_state.prev_grades[sub], "marks":marks, "sub_vals":sub_vals}).execute()
-                            st.session_state[f"ed_{sub}"] = False; st.rerun()
+                    st.caption(f"프로세스 시작 이후 지표별 최근 {perf.SAMPLE_WINDOW}건 기준. 왕복/회: 페이지·탭을 한 번 그릴 때의 DB 호출 수")
+                    summary = perf.RECORDER.summary()
+                    if summary: st.dataframe(pd.DataFrame(summary), hide_index=True)
+                    else: st.info("아직 기록이 없습니다.")
+                    pc1, pc2 = st.columns(2)
+                    pc1.download_button("JSONL 내보내기", perf.RECORDER.jsonl(), "perf.jsonl", "application/jsonl")
+                    if pc2.button("기록 초기화"): perf.RECORDER.reset(); st.rerun()
+
+        else:
+            # 학생 모드 (선택된 탭만 실행)
+            my_subs = list(st.session_state.prev_grades.keys())
+            tabs = st.tabs(my_subs + ["종합 성적표"], key="stu_tab", on_change="rerun")
         
-        with tabs[-1]:
-            st.header("📋 종합 성적표")
-            view_round = st.selectbox("회차 선택", range(cur_round, 0, -1))
-            
-            if sys_conf["exam_closed"] and view_round == cur_round:
-                st.write("📢 실제 등급을 입력하여 다음 예측 정확도를 높이세요.")
-                with st.form("real_grade"):
-                    new_pg = {}
-                    for s in my_subs:
-                        default_val = st.session_state.prev_grades.get(s, 5)
-                        val = st.number_input(f"{s} 확정 등급 (1~9)", 1, 9, int(default_val), key=f"real_{s}")
-                        new_pg[s] = min(5, val)
-                    
-                    if st.form_submit_button("저장"):
-                        supabase.table("users").update({"prev_grades": new_pg, "last_confirmed_round": sys_conf["current_round"]}).eq("username", user).execute()
-                        for sub, grade in new_pg.items():
-                            chk = supabase.table("submissions").select("*").eq("username", user).eq("subject", sub).eq("round", cur_round).execute()
-                            if chk.data: supabase.table("submissions").update({"final_grade": grade}).eq("username", user).eq("subject", sub).eq("round", cur_round).execute()
-                            else: supabase.table("submissions").insert({"username": user, "subject": sub, "round": cur_round, "total": None, "final_grade": grade}).execute()
-                        st.session_state.prev_grades = new_pg; st.success("저장됨"); st.balloons()
-            else:
-                res = supabase.table("submissions").select("*").eq("username", user).eq("round", view_round).execute()
-                rows = []
-                for r in res.data:
-                    final_g = r.get('final_grade')
-                    if final_g:
-                        grade_display = f"{final_g}등급 (확정)"
-                        score_display = f"{r['total']}점" if r['total'] is not None else "-"
-                    else:
-                        if r['total'] is not None:
-                            raw, homer, _, is_h = get_prediction(r['subject'], view_round)
-                            cuts = homer if is_h else raw
-                            grade_val = "1" if r['total']>=cuts['1'] else "2" if r['total']>=cuts['2'] else "3" if r['total']>=cuts['3'] else "4↓"
-                            grade_display = f"{grade_val}등급 (예측)"
-                            score_display = f"{r['total']}점"
-                        else: continue
-                    rows.append({"과목":r['subject'], "점수":score_display, "등급":grade_display})
-                if rows: st.table(pd.DataFrame(rows))
-                else: st.info("기록이 없습니다.")
\ No newline at end of file
+            for i, sub in enumerate(my_subs):
+                if tabs[i].open:
+                    with tabs[i]: subject_tab(user, sub, cur_round, sys_conf)
+        
+            if tabs[-1].open:
+                with tabs[-1]: report_tab(user, my_subs, cur_round, sys_conf)
+
+        # 여기서 끝낸 구간은 아래 finally 에서 다시 기록하지 않는다
+        st.sidebar.caption(f"⏱ 페이지 {perf.end(page):.0f}ms")
+finally:
+    perf.end(page)
@@ -0,0 +1,138 @@
+# ==========================================
+# 엔진 벤치마크 (가상 응시자 데이터)
+# ==========================================
+# 37개 과목 전부에 대해 과목당 N명(100 ~ 100,000)의 가상 제출을 만들고
+# 채점 / 등급컷 예측(구간 포함) / 석차 계산 / 문항 분석 시간을 잰다.
+#
+#   python benchmarks/bench_engine.py                  # 측정만
+#   python benchmarks/bench_engine.py --save           # baseline.json 갱신
+#   python benchmarks/bench_engine.py --check          # baseline 대비 느려졌으면 종료 코드 1 (작은 지표는 MIN_BASE 를 기준으로)
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import engine  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SIZES = (100, 1_000, 10_000, 100_000)
+SAMPLE = 1_000      # 건별 측정(스칼라 채점, 석차 조회/갱신)에 쓰는 표본 수
+TOLERANCE = 1.5     # baseline 대비 이 배수를 넘으면 회귀
+MIN_BASE = 5.0      # 잡음 바닥(각 지표 단위, ms/us): baseline 이 이보다 작으면 이 값을 기준으로 TOLERANCE 배를 본다
+
+def make_settings(rng, conf):
+    return {
+        "obj_answers": rng.integers(1, 6, conf["obj"]).tolist(),
+        "obj_scores": rng.choice([2.0, 2.5, 3.0, 3.5, 4.0], conf["obj"]).tolist(),
+        "sub_max_scores": [5.0] * conf["sub"],
+        "prev_avg": 60.0, "prev_cuts": {"1": 90.0, "2": 80.0, "3": 70.0},
+        "cut_weights": {"1": 1.0, "2": 1.2, "3": 1.5},
+        "dev_predict": {"1": 95, "2": 85, "3": 75, "4": 65, "5": 55},
+        "homer_mode": True, "homer_adj": {"1": 1.0, "2": 0.5, "3": 0.0},
+        "term_mid_cuts": {"1": 90.0, "2": 80.0, "3": 70.0}, "term_adj": {"1": 0.0, "2": 0.0, "3": 0.0},
+    }
+
+def make_cohort(rng, conf, d, n):
+    # 직전 등급이 좋을수록 정답을 고를 확률이 높다
+    prev_grades = rng.choice(engine.GRADES, n, p=[engine.GRADE_WEIGHTS[g] for g in engine.GRADES])
+    p_correct = (0.95 - 0.12 * (prev_grades - 1))[:, None]
+    hit = rng.random((n, conf["obj"])) < p_correct
+    wrong = rng.integers(1, 6, (n, conf["obj"]))
+    marks = np.where(hit, np.asarray(d["obj_answers"]), wrong).astype(np.uint8)
+    sub_vals = np.round(rng.random((n, conf["sub"])) * 5.0 * p_correct, 1)
+    return marks, sub_vals, prev_grades
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, (time.perf_counter() - t0) * 1000
+
+def run_size(n, seed, subjects):
+    rng = np.random.default_rng(seed)
+    acc = {"pack_ms": 0.0, "grade_batch_ms": 0.0, "grade_scalar_us": 0.0, "aggregate_ms": 0.0, "predict_ms": 0.0,
+           "bands_ms": 0.0, "items_ms": 0.0, "rank_build_ms": 0.0, "rank_query_us": 0.0, "rank_update_us": 0.0}
+    for sub in subjects:
+        conf = engine.SUBJECT_CONFIG[sub]
+        d = make_settings(rng, conf)
+        marks, sub_vals, prev_grades = make_cohort(rng, conf, d, n)
+        marks_l, sub_l = marks.tolist(), sub_vals.tolist()
+        k = min(n, SAMPLE)
+
+        (pm, ps), t = timed(lambda: (engine.pack_matrix(marks_l, conf["obj"], np.uint8), engine.pack_matrix(sub_l, conf["sub"], np.float64)))
+        acc["pack_ms"] += t
+        totals, t = timed(lambda: engine.score_batch(pm, ps, d))
+        acc["grade_batch_ms"] += t
+        _, t = timed(lambda: [engine.score_submission(marks_l[i], sub_l[i], d) for i in range(k)])
+        acc["grade_scalar_us"] += t * 1000 / k
+
+        aggs, t = timed(lambda: engine.aggregate_scores(totals, prev_grades))
+        acc["aggregate_ms"] += t
+        _, t = timed(lambda: engine.predict_term_cuts(d, engine.predict_cuts(d, aggs)[0]))
+        acc["predict_ms"] += t
+        _, t = timed(lambda: engine.bootstrap_cuts(d, totals, prev_grades))
+        acc["bands_ms"] += t
+        _, t = timed(lambda: engine.item_analysis(pm, totals, d["obj_answers"]))
+        acc["items_ms"] += t
+
+        totals_l = totals.tolist()
+        idx, t = timed(lambda: engine.RankIndex(totals_l))
+        acc["rank_build_ms"] += t
+        probe = rng.choice(totals_l, k).tolist()
+        _, t = timed(lambda: [idx.rank(v) for v in probe])
+        acc["rank_query_us"] += t * 1000 / k
+        _, t = timed(lambda: [idx.replace(v, v + 0.5) for v in probe])
+        acc["rank_update_us"] += t * 1000 / k
+    # 건별 지표는 과목 평균, 나머지는 전 과목 합
+    for key in ("grade_scalar_us", "rank_query_us", "rank_update_us"): acc[key] /= len(subjects)
+    return {k: round(v, 4) for k, v in acc.items()}
+
+def run(sizes, repeat, seed, subjects):
+    results = {}
+    for n in sizes:
+        runs = [run_size(n, seed, subjects) for _ in range(repeat)]
+        results[str(n)] = {k: min(r[k] for r in runs) for k in runs[0]}
+        print(f"n={n:>7} x {len(subjects)}과목  " + "  ".join(f"{k}={v}" for k, v in results[str(n)].items()), flush=True)
+    return results
+
+def check(results, baseline, tolerance):
+    bad = []
+    for n, metrics in results.items():
+        base = baseline.get("results", {}).get(n, {})
+        for k, v in metrics.items():
+            b = base.get(k)
+            if b is None: continue
+            if v > max(b, MIN_BASE) * tolerance: bad.append(f"n={n} {k}: {b} -> {v}")
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser(description="채점/예측/석차 엔진 벤치마크")
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    ap.add_argument("--subjects", nargs="+", default=list(engine.SUBJECT_CONFIG), help="기본: 전 과목")
+    ap.add_argument("--repeat", type=int, default=3, help="반복 중 가장 빠른 값을 쓴다")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--save", action="store_true", help="결과를 baseline.json 에 저장")
+    ap.add_argument("--check", action="store_true", help="baseline.json 과 비교")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = ap.parse_args()
+
+    results = run(args.sizes, args.repeat, args.seed, args.subjects)
+    if args.check:
+        with open(BASELINE, encoding="utf-8") as f: baseline = json.load(f)
+        bad = check(results, baseline, args.tolerance)
+        for line in bad: print("회귀:", line)
+        if bad: sys.exit(1)
+        print("baseline 대비 회귀 없음")
+    if args.save:
+        meta = {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                "subjects": len(args.subjects), "repeat": args.repeat, "seed": args.seed}
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"저장: {BASELINE}")
+
+if __name__ == "__main__":
+    main()
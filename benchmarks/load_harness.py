@@ -0,0 +1,238 @@
+# ==========================================
+# 동시 접속 부하 재현 (AppTest + 로컬 DB)
+# ==========================================
+# 시험 직후처럼 학생 여러 명이 한꺼번에 들어오는 상황을 app.py 그대로 돌려 본다.
+# 가상 학생 세션마다 로그인 -> 답안 제출 -> 새로고침(석차 확인) -> 학기말 점수 입력을 차례로 하고,
+# 세션 여러 개를 스레드로 동시에 돌린다. DB 는 localdb (호출마다 지연을 넣은 메모리 DB)를 쓰고
+# DB 왕복 수는 perf 계측(PERF=1)으로 센다.
+#
+#   python benchmarks/load_harness.py                                   # 40세션, 동시 10
+#   python benchmarks/load_harness.py --sessions 200 --concurrency 50 --latency-ms 30 --jitter-ms 10
+#   python benchmarks/load_harness.py --background 300 --json load.json # 과목당 기존 제출 300건
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+sys.path.insert(0, ROOT)
+import engine  # noqa: E402
+
+STEPS = ("open", "login", "submit", "rank", "term")
+ROUND = 1
+PASSWORD = "1"
+TOP_OPS = 8  # 보고서에 보일 (테이블.동작) 수
+
+# ----------------------------------
+# 초기 데이터
+# ----------------------------------
+def make_settings(rng, sub):
+    conf = engine.SUBJECT_CONFIG[sub]
+    return {"active": True, "obj_answers": rng.integers(1, 6, conf["obj"]).tolist(),
+            "obj_scores": rng.choice([2.0, 2.5, 3.0, 3.5, 4.0], conf["obj"]).tolist(),
+            "sub_criteria": ["채점 기준"] * conf["sub"], "sub_max_scores": [5.0] * conf["sub"],
+            "prev_avg": 60.0, "prev_cuts": {"1": 90.0, "2": 80.0, "3": 70.0},
+            "cut_weights": {"1": 1.0, "2": 1.2, "3": 1.5},
+            "dev_predict": {"1": 95, "2": 85, "3": 75, "4": 65, "5": 55},
+            "homer_mode": False, "homer_adj": {"1": 0.0, "2": 0.0, "3": 0.0}}
+
+def make_seed(rng, subjects, sessions, background):
+    # 세션 i 는 학생 s{i}, 과목은 돌아가며 하나씩 맡는다 (그 과목이 첫 탭이 되도록 prev_grades 순서를 바꾼다)
+    grades = lambda n: rng.choice(engine.GRADES, n, p=[engine.GRADE_WEIGHTS[g] for g in engine.GRADES]).tolist()
+    users = []
+    for i in range(sessions):
+        own = subjects[i % len(subjects)]
+        order = [own] + [s for s in subjects if s != own]
+        users.append({"username": f"s{i}", "password": PASSWORD, "role": "user", "grade": "1학년",
+                      "prev_grades": dict(zip(order, grades(len(order)))), "last_confirmed_round": ROUND})
+    settings = {sub: make_settings(rng, sub) for sub in subjects}
+    # 이미 제출해 둔 다른 학생들 (석차/등급컷 계산 규모)
+    subs_rows = []
+    for sub in subjects:
+        conf, d = engine.SUBJECT_CONFIG[sub], settings[sub]
+        for j, pg in enumerate(grades(background)):
+            marks = rng.integers(1, 6, conf["obj"]).tolist()
+            sub_vals = np.round(rng.random(conf["sub"]) * 5.0, 1).tolist()
+            subs_rows.append({"username": f"bg{j}", "subject": sub, "round": ROUND, "prev_grade": pg,
+                              "marks": marks, "sub_vals": sub_vals, "total": engine.score_submission(marks, sub_vals, d),
+                              "updated_at": f"2026-01-01T00:00:{j % 60:02d}+00:00"})
+    return {"users": users, "submissions": subs_rows,
+            "subject_settings": [{"subject": sub, "round": ROUND, "settings": d} for sub, d in settings.items()],
+            "system_config": [{"key": "config", "value": {"current_round": ROUND, "exam_closed": False, "term_end_mode": True}}]}
+
+# ----------------------------------
+# AppTest 를 스레드 여러 개에서 동시에 돌리기 위한 처리
+# ----------------------------------
+# AppTest 는 한 번에 한 스크립트만 돈다고 가정한다.
+# - run() 마다 전역 Runtime._instance 를 가짜로 바꿨다가 되돌린다 -> 한 번 만든 가짜를 모두가 같이 쓴다.
+# - run() 마다 ScriptCache 를 새로 만들어 app.py 를 다시 컴파일한다 (3.11 에서 동시 컴파일이 SystemError 를 낸다)
+#   -> 캐시 하나를 같이 써서 한 번만 컴파일한다.
+# - run() 마다 config 옵션을 덮어썼다가 되돌린다 -> 돌고 있는 세션이 있는 동안은 덮어쓴 채로 둔다.
+def patch_apptest():
+    from unittest.mock import MagicMock
+
+    import streamlit.testing.v1.app_test as app_test
+    import streamlit.testing.v1.local_script_runner as local_script_runner
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1.util import patch_config_options
+
+    rt = MagicMock(spec=Runtime)
+    rt.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    rt.dataframe_source_mgr = DataframeSourceManager()
+    rt.cache_storage_manager = MemoryCacheStorageManager()
+    rt.bidi_component_registry = BidiComponentManager()
+    rt.bidi_component_registry.discover_and_register_components(start_file_watching=False)
+    Runtime._instance = rt
+    app_test.Runtime = type("RuntimeShim", (), {"_instance": None})
+
+    cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: cache
+
+    lock, state = threading.Lock(), {"n": 0, "patch": None}
+    @contextlib.contextmanager
+    def shared_patch(opts):
+        with lock:
+            if state["n"] == 0: state["patch"] = patch_config_options(opts); state["patch"].__enter__()
+            state["n"] += 1
+        try: yield
+        finally:
+            with lock:
+                state["n"] -= 1
+                if state["n"] == 0: state["patch"].__exit__(None, None, None)
+    app_test.patch_config_options = shared_patch
+
+# ----------------------------------
+# 세션 한 개
+# ----------------------------------
+def button(at, label):
+    hit = [b for b in at.button if b.label == label]
+    if not hit: raise RuntimeError(f"'{label}' 버튼 없음")
+    return hit[0]
+
+def step(at, times, name, act=None):
+    if act: act()
+    t0 = time.perf_counter()
+    at.run()
+    times[name] = (time.perf_counter() - t0) * 1000
+    if at.exception: raise RuntimeError(f"{name}: {at.exception[0].message}")
+
+def flow(i, seed, timeout):
+    from streamlit.testing.v1 import AppTest
+    rng = np.random.default_rng(seed + i)
+    times = {}
+    out = {"session": i, "times": times, "error": None, "rank": None}
+    try:
+        at = AppTest.from_file(APP, default_timeout=timeout)
+        step(at, times, "open")
+        def login():
+            at.text_input(key="l_id").input(f"s{i}"); at.text_input(key="l_pw").input(PASSWORD)
+            button(at, "로그인").click()
+        step(at, times, "login", login)
+        sub = list(at.session_state["prev_grades"])[0]
+        def submit():
+            for idx in range(engine.SUBJECT_CONFIG[sub]["obj"]): at.selectbox(key=f"m_{sub}_{idx}").set_value(int(rng.integers(1, 6)))
+            button(at, "제출").click()
+        step(at, times, "submit", submit)
+        step(at, times, "rank", lambda: button(at, "🔄 새로고침").click())
+        out["rank"] = next((x.value for x in at.info if x.value.startswith("🏆")), None)
+        def term():
+            at.number_input(key=f"im_{sub}").set_value(float(rng.integers(40, 101)))
+            at.number_input(key=f"ip_{sub}").set_value(float(rng.integers(20, 41)))
+            button(at, "결과 확인").click()
+        step(at, times, "term", term)
+    except Exception as e:
+        out["error"] = f"{type(e).__name__}: {e}"
+    return out
+
+# ----------------------------------
+# 실행 / 보고
+# ----------------------------------
+def pct(vals):
+    if not vals: return {"n": 0}
+    p50, p95, p99 = np.percentile(vals, [50, 95, 99])
+    return {"n": len(vals), "p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1), "max_ms": round(max(vals), 1)}
+
+def run(args):
+    import perf
+    from streamlit import config, logger
+    patch_apptest()
+    # config 를 처음 읽을 때 로그 수준이 다시 잡히므로 먼저 읽어 두고 낮춘다 (use_container_width 경고 등)
+    config.get_config_options(); logger.set_log_level("error")
+    perf.RECORDER.reset()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as ex:
+        flows = list(ex.map(lambda i: flow(i, args.seed, args.timeout), range(args.sessions)))
+    elapsed = time.perf_counter() - t0
+
+    ok = [f for f in flows if f["error"] is None]
+    requests = sum(len(f["times"]) for f in flows)
+    db = [r for r in perf.RECORDER.summary() if r["종류"] == "db"]
+    db_calls = sum(r["횟수"] for r in db)
+    return {
+        "config": {"sessions": args.sessions, "concurrency": args.concurrency, "latency_ms": args.latency_ms,
+                   "jitter_ms": args.jitter_ms, "subjects": args.subjects, "background": args.background, "seed": args.seed},
+        "elapsed_s": round(elapsed, 3), "completed": len(ok), "failed": len(flows) - len(ok),
+        "flows_per_s": round(len(ok) / elapsed, 3), "requests_per_s": round(requests / elapsed, 3),
+        "steps": {s: pct([f["times"][s] for f in flows if s in f["times"]]) for s in STEPS},
+        "db": {"calls": db_calls, "per_flow": round(db_calls / max(len(flows), 1), 2),
+               "by_op": {r["이름"]: {"calls": r["횟수"], "p50_ms": r["p50_ms"], "rows": r["행"]}
+                         for r in sorted(db, key=lambda r: -r["횟수"])}},
+        "errors": [f"s{f['session']}: {f['error']}" for f in flows if f["error"]],
+    }
+
+def report(res):
+    c = res["config"]
+    print(f"세션 {c['sessions']} (동시 {c['concurrency']}), DB 지연 {c['latency_ms']}ms + 0~{c['jitter_ms']}ms, "
+          f"과목 {len(c['subjects'])}개, 기존 제출 과목당 {c['background']}건")
+    print(f"완료 {res['completed']} / 실패 {res['failed']}, {res['elapsed_s']:.1f}s -> "
+          f"{res['flows_per_s']:.2f} 흐름/s, {res['requests_per_s']:.2f} 요청/s")
+    print(f"{'단계':<8}{'횟수':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'최대':>10}  (ms)")
+    for s, p in res["steps"].items():
+        if p["n"]: print(f"{s:<8}{p['n']:>6}{p['p50_ms']:>10}{p['p95_ms']:>10}{p['p99_ms']:>10}{p['max_ms']:>10}")
+    print(f"DB 왕복 {res['db']['calls']}회 (흐름당 {res['db']['per_flow']})")
+    for name, r in list(res["db"]["by_op"].items())[:TOP_OPS]: print(f"  {name:<32}{r['calls']:>7}회  p50 {r['p50_ms']}ms  {r['rows']}행")
+    for e in res["errors"][:10]: print("실패:", e)
+
+def main():
+    ap = argparse.ArgumentParser(description="동시 접속 부하 재현 (AppTest + 로컬 DB)")
+    ap.add_argument("--sessions", type=int, default=40, help="가상 학생 수 (세션당 흐름 한 번)")
+    ap.add_argument("--concurrency", type=int, default=10, help="동시에 도는 세션 수")
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="DB 호출당 지연")
+    ap.add_argument("--jitter-ms", type=float, default=5.0, help="DB 호출당 추가 지연 (0 ~ 이 값 균등)")
+    ap.add_argument("--subjects", nargs="+", default=engine.GRADE_SUBJECTS["1학년"][:3])
+    ap.add_argument("--background", type=int, default=100, help="과목당 미리 넣어 둘 제출 수")
+    ap.add_argument("--timeout", type=float, default=120.0, help="스크립트 한 번 실행 제한 (초)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="결과를 JSON 으로 저장할 경로")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="load_harness_")
+    seed_path = os.path.join(tmp, "seed.json")
+    with open(seed_path, "w", encoding="utf-8") as f:
+        json.dump(make_seed(np.random.default_rng(args.seed), args.subjects, args.sessions, args.background), f, ensure_ascii=False)
+    # app.py / perf 가 읽기 전에 환경을 잡아 둔다 (AppTest 는 같은 프로세스에서 app.py 를 돌린다)
+    os.environ.update(LOCAL_DB="1", LOCAL_DB_SEED=seed_path, PERF="1",
+                      LOCAL_DB_LATENCY_MS=str(args.latency_ms), LOCAL_DB_JITTER_MS=str(args.jitter_ms))
+
+    res = run(args)
+    report(res)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(res, f, ensure_ascii=False, indent=2)
+        print(f"저장: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# ==========================================
+# 채점 / 등급컷 예측 / 석차 엔진
+# ==========================================
+# streamlit, plotly, supabase 없이 불러 쓸 수 있는 순수 계산 부분.
+# app.py 와 벤치마크(benchmarks/)가 같이 쓴다.
+import bisect
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, TypedDict
+
+import numpy as np
+
+# 과목 데이터
+SUBJECT_CONFIG = {
+    "국어(1학년)": {"obj": 24, "sub": 6}, "영어(1학년)": {"obj": 22, "sub": 5}, "수학(1학년)": {"obj": 17, "sub": 5},
+    "통합사회": {"obj": 24, "sub": 6}, "통합과학": {"obj": 22, "sub": 5}, "한국사": {"obj": 20, "sub": 8},
+    "대수": {"obj": 17, "sub": 5}, "미적분1": {"obj": 17, "sub": 5}, "확률과 통계": {"obj": 17, "sub": 5},
+    "수학과제탐구": {"obj": 17, "sub": 5}, "국어(2학년)": {"obj": 24, "sub": 6}, "영어(2학년)": {"obj": 22, "sub": 8},
+    "물리": {"obj": 20, "sub": 6}, "화학": {"obj": 20, "sub": 6}, "생물": {"obj": 20, "sub": 6}, "지구": {"obj": 20, "sub": 6},
+    "사회문화": {"obj": 20, "sub": 8}, "윤리": {"obj": 25, "sub": 5}, "지리": {"obj": 20, "sub": 6}, "역사": {"obj": 20, "sub": 6},
+    "중국어": {"obj": 28, "sub": 0}, "일본어": {"obj": 28, "sub": 0},
+    "독서와 작문": {"obj": 24, "sub": 6}, "영어 독해와 작문": {"obj": 22, "sub": 8}, "전문 수학": {"obj": 17, "sub": 5},
+    "언어생활탐구": {"obj": 24, "sub": 6}, "경제수학": {"obj": 17, "sub": 5}, "미적분2": {"obj": 17, "sub": 5},
+    "심화 영어": {"obj": 22, "sub": 8}, "경제": {"obj": 20, "sub": 8}, "한국지리 탐구": {"obj": 20, "sub": 6},
+    "동아시아 역사 기행": {"obj": 20, "sub": 6}, "윤리와 사상": {"obj": 25, "sub": 5}, "전자기와 양자": {"obj": 20, "sub": 6},
+    "화학 반응의 세계": {"obj": 19, "sub": 6}, "생물의 유전": {"obj": 20, "sub": 6}, "행성우주과학": {"obj": 20, "sub": 6}
+}
+
+GRADE_SUBJECTS = {
+    "1학년": ["국어(1학년)", "영어(1학년)", "수학(1학년)", "통합사회", "통합과학", "한국사"],
+    "2학년": ["대수", "미적분1", "확률과 통계", "수학과제탐구", "국어(2학년)", "영어(2학년)", "물리", "화학", "생물", "지구", "사회문화", "윤리", "지리", "역사", "중국어", "일본어"],
+    "3학년": ["독서와 작문", "영어 독해와 작문", "전문 수학", "언어생활탐구", "경제수학", "미적분2", "심화 영어", "경제", "한국지리 탐구", "동아시아 역사 기행", "윤리와 사상", "전자기와 양자", "화학 반응의 세계", "생물의 유전", "행성우주과학"]
+}
+
+GRADES = (1, 2, 3, 4, 5)
+GRADE_WEIGHTS = {1: 0.1, 2: 0.24, 3: 0.32, 4: 0.24, 5: 0.1}  # 직전 등급 분포 (정규분포 근사)
+
+Cuts = Dict[str, float]                     # {"1": 1컷, "2": 2컷, "3": 3컷}
+Aggregates = Dict[int, Tuple[float, int]]   # 직전 등급 -> (점수 합, 인원)
+
+class SubjectSettings(TypedDict, total=False):
+    active: bool
+    obj_answers: List[int]
+    obj_scores: List[float]
+    sub_criteria: List[str]
+    sub_max_scores: List[float]
+    prev_avg: float
+    prev_cuts: Cuts
+    cut_weights: Cuts
+    dev_predict: Dict[str, float]
+    homer_mode: bool
+    homer_adj: Cuts
+    term_mid_cuts: Cuts
+    term_adj: Cuts
+
+# ----------------------------------
+# 채점
+# ----------------------------------
+def score_submission(marks: Sequence[int], sub_vals: Sequence[float], d: SubjectSettings) -> float:
+    op = sum(d["obj_scores"][x] for x, m in enumerate(marks) if m == d["obj_answers"][x])
+    return round(op + sum(sub_vals), 2)
+
+def pack_matrix(lists: Iterable[Optional[Sequence]], width: int, dtype) -> np.ndarray:
+    # 길이가 제각각인 목록들을 (행 수 x width) 배열로 맞춘다 (모자라면 0)
+    rows = list(lists)
+    try:
+        arr = np.array(rows, dtype=dtype)
+        if arr.shape == (len(rows), width): return arr
+    except (ValueError, TypeError):
+        pass
+    padded = [(list(v or []) + [0] * width)[:width] for v in rows]
+    return np.array(padded, dtype=dtype).reshape(len(rows), width)
+
+def score_batch(marks: np.ndarray, sub_vals: np.ndarray, d: SubjectSettings) -> np.ndarray:
+    # 서술형은 만점을 넘지 않게 자른다 (제출 폼과 같은 제한)
+    answers = np.asarray(d["obj_answers"], dtype=np.uint8)
+    scores = np.asarray(d["obj_scores"], dtype=np.float64)
+    sub_max = np.asarray(d["sub_max_scores"], dtype=np.float64)
+    return np.round((marks == answers) @ scores + np.minimum(sub_vals, sub_max).sum(axis=1), 2)
+
+# ----------------------------------
+# 등급컷 예측
+# ----------------------------------
+def aggregate_scores(totals: np.ndarray, prev_grades: np.ndarray) -> Aggregates:
+    ok = np.isin(prev_grades, GRADES)
+    sums = np.bincount(prev_grades[ok], weights=totals[ok], minlength=6)
+    cnts = np.bincount(prev_grades[ok], minlength=6)
+    return {g: (float(sums[g]), int(cnts[g])) for g in GRADES}
+
+def total_count(aggs: Aggregates) -> int:
+    return sum(c for _, c in aggs.values())
+
+def group_means(aggs: Aggregates, fallback: Dict[int, float]) -> Dict[int, float]:
+    return {g: (aggs[g][0] / aggs[g][1]) if aggs[g][1] > 0 else fallback[g] for g in GRADES}
+
+def predict_cuts(d: SubjectSettings, aggs: Aggregates) -> Tuple[Cuts, Cuts, int, bool]:
+    cnt = total_count(aggs)
+    if cnt == 0:
+        raw_cuts = dict(d["prev_cuts"])
+    else:
+        g_avgs = group_means(aggs, {g: float(d["dev_predict"][str(g)]) for g in GRADES})
+        cur_avg = sum(g_avgs[g] * GRADE_WEIGHTS[g] for g in GRADES)
+        delta = cur_avg - d["prev_avg"]
+        raw_cuts = {g: round(d["prev_cuts"][g] + (delta * d["cut_weights"][g]), 1) for g in ["1", "2", "3"]}
+
+    is_homer = bool(d.get("homer_mode", False))
+    homer_cuts = raw_cuts.copy()
+    if is_homer:
+        adj = d["homer_adj"]
+        homer_cuts = {g: raw_cuts[g] + adj[g] for g in ["1", "2", "3"]}
+    return raw_cuts, homer_cuts, cnt, is_homer
+
+Bands = Dict[str, Tuple[float, float]]     # {"1": (하한, 상한), ...}
+BOOT_SAMPLES = 2000
+BOOT_CHUNK = 2_000_000  # 한 번에 만드는 재표본 원소 수 (메모리 상한)
+BOOT_EXACT = 1_000_000  # 인원 x 재표본 수가 이 이하면 실제로 복원추출한다 (기본 재표본 수면 500명까지)
+
+def bootstrap_cuts(d: SubjectSettings, totals: np.ndarray, prev_grades: np.ndarray, n_boot: int = BOOT_SAMPLES,
+                   level: float = 0.9, seed: int = 0) -> Optional[Tuple[Bands, Bands]]:
+    # 제출을 복원추출로 n_boot 번 다시 뽑아 predict_cuts 와 같은 식으로 컷을 구하고, 구간(level)을 돌려준다: (실시간, 호머)
+    ok = np.isin(prev_grades, GRADES)
+    totals, prev_grades = np.asarray(totals, dtype=np.float64)[ok], np.asarray(prev_grades)[ok].astype(np.intp)
+    n = len(totals)
+    if n == 0: return None
+    rng = np.random.default_rng(seed)
+    fallback = np.array([0.0] + [float(d["dev_predict"][str(g)]) for g in GRADES])
+    weights = np.array([0.0] + [GRADE_WEIGHTS[g] for g in GRADES])
+    if n * n_boot <= BOOT_EXACT:
+        cur_avg = np.empty(n_boot)
+        chunk = max(1, BOOT_CHUNK // n)
+        for start in range(0, n_boot, chunk):
+            b = min(chunk, n_boot - start)
+            idx = rng.integers(0, n, (b, n), dtype=np.int32)
+            # 재표본마다 등급별 합/인원: (재표본 번호 x 6 + 등급) 으로 bincount 한 번
+            code = (prev_grades[idx] + np.arange(b)[:, None] * 6).ravel()
+            sums = np.bincount(code, weights=totals[idx].ravel(), minlength=b * 6).reshape(b, 6)
+            cnts = np.bincount(code, minlength=b * 6).reshape(b, 6)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = np.where(cnts > 0, sums / cnts, fallback)
+            cur_avg[start:start + b] = means @ weights
+    else:
+        # 인원이 많으면 재표본의 등급별 인원(다항분포)과 등급 평균(정규 근사)만 뽑는다: O(n_boot)
+        cnt0 = np.bincount(prev_grades, minlength=6)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean0 = np.bincount(prev_grades, weights=totals, minlength=6) / cnt0
+            var0 = np.bincount(prev_grades, weights=totals ** 2, minlength=6) / cnt0 - mean0 ** 2
+            cnts = rng.multinomial(n, cnt0 / n, size=n_boot)
+            draw = rng.normal(np.nan_to_num(mean0), np.sqrt(np.maximum(np.nan_to_num(var0), 0) / np.maximum(cnts, 1)))
+        cur_avg = np.where(cnts > 0, draw, fallback) @ weights
+    delta = cur_avg - d["prev_avg"]
+    tail = (1 - level) / 2 * 100
+    raw = {}
+    for g in ["1", "2", "3"]:
+        lo, hi = np.percentile(d["prev_cuts"][g] + delta * d["cut_weights"][g], [tail, 100 - tail])
+        raw[g] = (round(float(lo), 1), round(float(hi), 1))
+    homer = raw
+    if d.get("homer_mode", False):
+        homer = {g: (raw[g][0] + d["homer_adj"][g], raw[g][1] + d["homer_adj"][g]) for g in ["1", "2", "3"]}
+    return raw, homer
+
+def predict_term_cuts(d: SubjectSettings, current_exam_cuts: Cuts) -> Cuts:
+    mid_cuts = d.get("term_mid_cuts", {"1": 90, "2": 80, "3": 70})
+    adj = d.get("term_adj", {"1": 0.0, "2": 0.0, "3": 0.0})
+    if isinstance(adj, float): adj = {"1": adj, "2": adj, "3": adj}
+    return {g: round((current_exam_cuts[g] * 0.3) + (mid_cuts[g] * 0.3) + 40 + adj[g], 2) for g in ["1", "2", "3"]}
+
+def grade_for(score: float, cuts: Cuts) -> str:
+    return "1" if score >= cuts['1'] else "2" if score >= cuts['2'] else "3" if score >= cuts['3'] else "4↓"
+
+# ----------------------------------
+# 문항 분석
+# ----------------------------------
+CHOICES = 5
+ItemStats = Dict[str, np.ndarray]   # 지표 -> 문항별 값
+
+def choice_counts(marks: np.ndarray) -> np.ndarray:
+    # (문항 x 0~5) 선택 횟수. 문항 번호로 구간을 나눈 bincount 한 번으로 센다.
+    q = marks.shape[1]
+    flat = (marks.astype(np.intp) + np.arange(q) * (CHOICES + 1)).ravel()
+    return np.bincount(flat, minlength=q * (CHOICES + 1)).reshape(q, CHOICES + 1)
+
+def item_analysis(marks: np.ndarray, totals: np.ndarray, answers: Sequence[int], group: float = 0.27) -> ItemStats:
+    # marks: (학생 x 문항) uint8, 0 은 무응답. 모든 지표를 문항 축으로 한 번에 계산한다.
+    n, q = marks.shape
+    key = np.asarray(answers, dtype=np.uint8)[:q]
+    dist = choice_counts(marks)
+    if n == 0:
+        zero = np.zeros(q)
+        return {"dist": dist[:, 1:], "blank": dist[:, 0], "p": zero, "disc": zero, "pbis": np.full(q, np.nan),
+                "top_pick": np.zeros(q, dtype=np.intp), "suspect": np.zeros(q, dtype=bool)}
+    correct = marks == key
+    p = correct.mean(axis=0)
+
+    # 변별도: 총점 상위 27% 와 하위 27% 의 정답률 차이
+    k = max(1, int(round(n * group)))
+    low, high = np.argpartition(totals, k - 1)[:k], np.argpartition(totals, n - k)[n - k:]  # 전체 정렬 없이 양 끝만
+    disc = correct[high].mean(axis=0) - correct[low].mean(axis=0)
+    # 상위 집단이 가장 많이 고른 선택지 (정답과 다르면 정답 오류 의심)
+    top_pick = choice_counts(marks[high])[:, 1:].argmax(axis=1) + 1
+
+    # 점이연 상관: 정답 여부(0/1)와 총점의 피어슨 상관. 0/1 열의 표준편차는 sqrt(p(1-p)) 이고
+    # 편차 총점의 합이 0 이라 공분산은 행렬곱 한 번(t @ correct / n)으로 나온다.
+    t = totals - totals.mean()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pbis = (t @ correct / n) / (np.sqrt(p * (1 - p)) * t.std())
+
+    suspect = (disc < 0) | (np.nan_to_num(pbis) < 0) | (top_pick != key)
+    return {"dist": dist[:, 1:], "blank": dist[:, 0], "p": p, "disc": disc, "pbis": pbis, "top_pick": top_pick, "suspect": suspect}
+
+# ----------------------------------
+# 석차
+# ----------------------------------
+def term_key(r: dict) -> Optional[float]:
+    if r.get('total') is None or r.get('mid_score') is None or r.get('perf_score') is None: return None
+    return round((r['total'] * 0.3) + (r['mid_score'] * 0.3) + r['perf_score'], 2)
+
+# 오름차순 정렬 배열 + bisect. 석차/동점자/총원을 O(log n)에 구한다.
+class RankIndex:
+    def __init__(self, values: Iterable[float] = ()):
+        self._keys = sorted(values)
+
+    def add(self, v: float) -> None:
+        bisect.insort(self._keys, v)
+
+    def remove(self, v: float) -> None:
+        i = bisect.bisect_left(self._keys, v)
+        if i < len(self._keys) and self._keys[i] == v: del self._keys[i]
+
+    def replace(self, old: Optional[float], new: Optional[float]) -> None:
+        if old is not None: self.remove(old)
+        if new is not None: self.add(new)
+
+    def rank(self, v: Optional[float]) -> Tuple[int, int, int]:
+        n = len(self._keys)
+        if v is None: return 0, 0, n
+        lo, hi = bisect.bisect_left(self._keys, v), bisect.bisect_right(self._keys, v)
+        if lo == hi: return 0, 0, n
+        return n - hi + 1, hi - lo, n
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+def rank_array(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # 모든 값의 (석차, 동점자 수)를 한 번에 구한다. RankIndex.rank 와 같은 규칙.
+    keys = np.sort(values)
+    lo, hi = np.searchsorted(keys, values, "left"), np.searchsorted(keys, values, "right")
+    return len(keys) - hi + 1, hi - lo
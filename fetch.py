@@ -0,0 +1,64 @@
+# ==========================================
+# 페이지 단위 조회 (PostgREST 행 수 제한 우회)
+# ==========================================
+# .select().execute() 한 번은 서버의 max-rows(기본 1000행)까지만 돌려준다.
+# iter_rows 는 .range() 로 페이지를 나눠 스레드 풀에서 동시에 받아오고,
+# 순서대로 한 행씩 흘려보낸다. 컬럼은 호출하는 쪽이 꼭 필요한 것만 지정한다.
+# 페이지 작업은 호출한 쪽의 contextvars 를 그대로 들고 간다 (perf 계측 구간 등).
+# 스레드 풀은 프로세스에 하나(POOL_WORKERS)만 두고 모든 호출이 같이 쓴다. 세션이 몇 개든
+# 페이지 조회 스레드/HTTP 연결 수는 POOL_WORKERS 를 넘지 않는다 (호출 하나는 workers 개까지만 동시에 받는다).
+# 페이지 작업 안에서 다시 iter_rows 를 부르면 안 된다 (같은 풀에서 서로 기다릴 수 있음).
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+PAGE_SIZE = 1000
+MAX_WORKERS = 4     # 호출 하나가 동시에 받는 페이지 수
+POOL_WORKERS = 16   # 프로세스 전체 페이지 조회 스레드 수
+
+_pool = ThreadPoolExecutor(max_workers=POOL_WORKERS, thread_name_prefix="fetch")
+
+def build_query(client, table, columns, filters=None, order=(), count=None, since=None):
+    # since=(컬럼, 값) 이면 그 값 이후(gte)인 행만. 같은 시각에 늦게 커밋된 행을 놓치지 않게 경계도 다시 받는다
+    q = client.table(table).select(columns, count=count) if count else client.table(table).select(columns)
+    for k, v in (filters or {}).items():
+        q = q.in_(k, list(v)) if isinstance(v, (list, tuple, set)) else q.eq(k, v)
+    if since: q = q.gte(since[0], since[1])
+    for col in order: q = q.order(col)
+    return q
+
+def iter_rows(client, table, columns, filters=None, order=("username",), page_size=PAGE_SIZE, workers=MAX_WORKERS, since=None):
+    # order 는 페이지 경계가 흔들리지 않도록 유일한 키(조합)여야 한다
+    def page(start, size):
+        return build_query(client, table, columns, filters, order, since=since).range(start, start + size - 1).execute().data
+
+    first = build_query(client, table, columns, filters, order, count="exact", since=since).range(0, page_size - 1).execute()
+    yield from first.data
+    total = first.count if first.count is not None else len(first.data)
+    if len(first.data) == 0 or total <= len(first.data): return
+    # 서버 max-rows 가 page_size 보다 작으면 실제로 받은 크기에 맞춘다
+    size = min(page_size, len(first.data))
+
+    offsets = list(range(size, total, size))
+    last = []
+    workers = max(1, workers)
+    pending = [_pool.submit(contextvars.copy_context().run, page, o, size) for o in offsets[:workers]]
+    nxt = len(pending)
+    try:
+        while pending:
+            last = pending.pop(0).result()
+            if nxt < len(offsets):
+                pending.append(_pool.submit(contextvars.copy_context().run, page, offsets[nxt], size)); nxt += 1
+            yield from last
+    finally:
+        # 중간에 그만 읽으면 (미리보기 등) 아직 시작하지 않은 페이지는 취소
+        for f in pending: f.cancel()
+
+    # 조회 도중 행이 늘었으면 짧은 페이지가 나올 때까지 이어서 받는다
+    start = (offsets[-1] if offsets else 0) + size
+    while len(last) == size:
+        last = page(start, size)
+        yield from last
+        start += size
+
+def fetch_all(client, table, columns, filters=None, order=("username",), **kw):
+    return list(iter_rows(client, table, columns, filters, order, **kw))
@@ -0,0 +1,317 @@
+# ==========================================
+# 로컬 DB (Supabase 클라이언트 대역)
+# ==========================================
+# app.py 가 쓰는 table().select().eq()...execute() 체인만 흉내 낸 메모리 DB.
+# - 테이블마다 기본키와 보조 인덱스를 두어 eq 조회는 전체를 훑지 않는다.
+# - 호출마다 지연(latency, jitter)을 넣을 수 있고, 왕복 횟수/시간을 (테이블, 동작)별로 센다.
+# - touch 컬럼은 DB 기본값/트리거처럼 쓰기마다 현재 시각으로 찍는다 (submissions.updated_at).
+# - upstream 에 실제 클라이언트를 주면 읽기는 로컬 사본에서, 쓰기는 upstream 에 먼저 보내는
+#   읽기 전용 미러(read-through mirror)로 동작한다. 테이블마다 한 스레드만 upstream 을 다시 읽고,
+#   그동안 로컬에 쓴 것은 새 사본에 다시 적용한다.
+import copy
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from fetch import fetch_all
+
+# 테이블 -> 기본키, 보조 인덱스, 쓰기 시각 컬럼
+SCHEMA = {
+    "users": {"pk": ("username",), "indexes": []},
+    "submissions": {"pk": ("username", "subject", "round"), "indexes": [("subject", "round"), ("username", "round"), ("round",)], "touch": "updated_at"},
+    "subject_settings": {"pk": ("subject", "round"), "indexes": []},
+    "system_config": {"pk": ("key",), "indexes": []},
+    "grade_aggregates": {"pk": ("subject", "round", "prev_grade"), "indexes": [("subject", "round"), ("round",)]},
+    "round_snapshots": {"pk": ("subject", "round"), "indexes": [("round",)]},
+    "round_results": {"pk": ("username", "subject", "round"), "indexes": [("username", "round"), ("round",)]},
+}
+
+class LocalDBError(Exception):
+    pass
+
+class Result:
+    def __init__(self, data, count=None):
+        self.data, self.count = data, count
+
+class Table:
+    def __init__(self, name, pk=None, indexes=(), touch=None):
+        self.name, self.touch = name, touch
+        self.pk = tuple(pk) if pk else None
+        self.rows = {}     # 기본키 -> 행
+        self.indexes = {cols: {} for cols in indexes}  # 컬럼 조합 -> {값 조합: 기본키 집합}
+        self._seq = 0
+
+    def key_of(self, row, cols=None):
+        cols = cols or self.pk
+        if cols is None:
+            self._seq += 1
+            return self._seq
+        return tuple(row.get(c) for c in cols)
+
+    def _index(self, key, row, add):
+        for cols, idx in self.indexes.items():
+            k = tuple(row.get(c) for c in cols)
+            bucket = idx.setdefault(k, set())
+            if add: bucket.add(key)
+            else:
+                bucket.discard(key)
+                if not bucket: del idx[k]
+
+    def put(self, key, row):
+        old = self.rows.get(key)
+        if old is not None: self._index(key, old, False)
+        self.rows[key] = row
+        self._index(key, row, True)
+
+    def pop(self, key):
+        row = self.rows.pop(key)
+        self._index(key, row, False)
+        return row
+
+    def candidates(self, eqs):
+        # eq 조건으로 기본키나 인덱스를 쓸 수 있으면 그 범위만 돌려준다
+        if self.pk and all(c in eqs for c in self.pk):
+            key = tuple(eqs[c] for c in self.pk)
+            return [key] if key in self.rows else []
+        best = None
+        for cols, idx in self.indexes.items():
+            if all(c in eqs for c in cols):
+                keys = idx.get(tuple(eqs[c] for c in cols), set())
+                if best is None or len(keys) < len(best): best = keys
+        return list(self.rows) if best is None else list(best)
+
+_OPS = {
+    "eq": lambda a, b: a == b, "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b, "gte": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b, "lte": lambda a, b: a is not None and a <= b,
+    "in": lambda a, b: a in b, "is": lambda a, b: a is b,
+}
+
+class Query:
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.op, self.payload, self.on_conflict = "select", None, None
+        self.columns, self.count = "*", None
+        self.filters, self.orders, self.window = [], [], None
+
+    # --- 동작 ---
+    def select(self, columns="*", count=None):
+        self.op, self.columns, self.count = "select", columns, count
+        return self
+
+    def insert(self, payload, **kw):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict=None, **kw):
+        self.op, self.payload, self.on_conflict = "upsert", payload, on_conflict
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    # --- 조건 ---
+    def _f(self, op, col, val):
+        self.filters.append((op, col, val))
+        return self
+
+    def eq(self, col, val): return self._f("eq", col, val)
+    def neq(self, col, val): return self._f("neq", col, val)
+    def gt(self, col, val): return self._f("gt", col, val)
+    def gte(self, col, val): return self._f("gte", col, val)
+    def lt(self, col, val): return self._f("lt", col, val)
+    def lte(self, col, val): return self._f("lte", col, val)
+    def in_(self, col, vals): return self._f("in", col, list(vals))
+    def is_(self, col, val): return self._f("is", col, None if val in (None, "null") else val)
+
+    def order(self, col, desc=False, **kw):
+        self.orders.append((col, desc))
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end + 1)
+        return self
+
+    def limit(self, n):
+        self.window = (0, n)
+        return self
+
+    def execute(self):
+        return self.db._execute(self)
+
+class LocalDB:
+    def __init__(self, latency=0.0, jitter=0.0, upstream=None, mirror_ttl=60.0, schema=SCHEMA):
+        self.latency, self.jitter = latency, jitter
+        self.upstream, self.mirror_ttl = upstream, mirror_ttl
+        self.schema = schema
+        self.tables = {}
+        self._loaded = {}        # 미러: 테이블 -> 마지막으로 upstream 에서 읽은 시각
+        self._mirror_locks = {}  # 미러: 테이블 -> 다시 읽기 락 (한 번에 한 스레드만 upstream 전체를 받는다)
+        self._pending = {}       # 미러: 다시 읽는 중인 테이블 -> 그동안 로컬에 적용한 쓰기
+        self._lock = threading.RLock()
+        self.reset_stats()
+
+    def table(self, name):
+        return Query(self, name)
+
+    # --- 통계 ---
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.stats = {}  # (테이블, 동작) -> [횟수, 누적 초, 행 수]
+
+    def stats_rows(self):
+        with self._lock:
+            return [{"table": t, "op": op, "calls": n, "total_ms": round(sec * 1000, 2), "rows": rows}
+                    for (t, op), (n, sec, rows) in sorted(self.stats.items())]
+
+    # --- 데이터 적재 ---
+    def load(self, tables):
+        with self._lock:
+            for name, rows in tables.items():
+                t = self._table(name)
+                for r in rows: t.put(t.key_of(r), copy.deepcopy(r))
+
+    def load_json(self, path):
+        with open(path, encoding="utf-8") as f: self.load(json.load(f))
+
+    def dump(self):
+        with self._lock:
+            return {name: copy.deepcopy(list(t.rows.values())) for name, t in self.tables.items()}
+
+    def _table(self, name):
+        t = self.tables.get(name)
+        if t is None:
+            spec = self.schema.get(name, {})
+            t = self.tables[name] = Table(name, spec.get("pk"), spec.get("indexes", ()), spec.get("touch"))
+        return t
+
+    # --- 실행 ---
+    def _execute(self, q):
+        t0 = time.perf_counter()
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0: time.sleep(delay)
+        if self.upstream is not None: self._mirror(q)
+        with self._lock:
+            res = getattr(self, "_" + q.op)(self._table(q.table), q)
+            if q.op != "select" and q.table in self._pending: self._pending[q.table].append(q)
+            st = self.stats.setdefault((q.table, q.op), [0, 0.0, 0])
+            st[0] += 1; st[1] += time.perf_counter() - t0; st[2] += len(res.data)
+            self.calls += 1
+        return res
+
+    def _mirror(self, q):
+        if q.op != "select":
+            # 쓰기는 upstream 에 먼저 보낸 뒤 같은 쿼리를 로컬에도 적용한다
+            up = self.upstream.table(q.table)
+            if q.op == "insert": up = up.insert(q.payload)
+            elif q.op == "upsert": up = up.upsert(q.payload, on_conflict=q.on_conflict) if q.on_conflict else up.upsert(q.payload)
+            elif q.op == "update": up = up.update(q.payload)
+            else: up = up.delete()
+            for op, col, val in q.filters: up = getattr(up, "in_" if op == "in" else op + ("_" if op == "is" else ""))(col, val)
+            up.execute()
+            return
+        if self._fresh(q.table): return
+        with self._lock:
+            tlock = self._mirror_locks.setdefault(q.table, threading.Lock())
+            has_copy = q.table in self._loaded
+        # 사본이 있으면 다른 스레드가 다시 받는 동안 기다리지 않고 지난 사본을 읽는다
+        if not tlock.acquire(blocking=not has_copy): return
+        try:
+            if self._fresh(q.table): return
+            with self._lock: self._pending[q.table] = []
+            spec = self.schema.get(q.table, {})
+            rows = fetch_all(self.upstream, q.table, "*", order=spec.get("pk") or ())
+            with self._lock:
+                t = Table(q.table, spec.get("pk"), spec.get("indexes", ()), spec.get("touch"))
+                for r in rows: t.put(t.key_of(r), r)
+                # 받는 동안 로컬에 적용된 쓰기는 새 사본에도 다시 적용한다 (upstream 에 이미 있어도 결과는 같다)
+                for w in self._pending.pop(q.table): getattr(self, "_upsert" if w.op == "insert" else "_" + w.op)(t, w)
+                self.tables[q.table] = t
+                self._loaded[q.table] = time.monotonic()
+        finally:
+            with self._lock: self._pending.pop(q.table, None)
+            tlock.release()
+
+    def _fresh(self, table):
+        loaded = self._loaded.get(table)
+        return loaded is not None and time.monotonic() - loaded < self.mirror_ttl
+
+    def _match(self, t, q):
+        eqs = {col: val for op, col, val in q.filters if op == "eq"}
+        out = []
+        for key in t.candidates(eqs):
+            row = t.rows.get(key)
+            if row is not None and all(_OPS[op](row.get(col), val) for op, col, val in q.filters): out.append((key, row))
+        return out
+
+    def _select(self, t, q):
+        rows = [r for _, r in self._match(t, q)]
+        for col, desc in reversed(q.orders):
+            rows.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+        total = len(rows)
+        if q.window: rows = rows[q.window[0]:q.window[1]]
+        if q.columns.strip() != "*":
+            cols = [c.strip() for c in q.columns.split(",") if c.strip()]
+            rows = [{c: r.get(c) for c in cols} for r in rows]
+        return Result(copy.deepcopy(rows), total if q.count else None)
+
+    def _stamp(self, t, row):
+        # 미러는 upstream 이 찍은 값을 그대로 쓴다 (다음 미러 갱신 때 들어옴)
+        if t.touch and self.upstream is None: row[t.touch] = datetime.now(timezone.utc).isoformat()
+        return row
+
+    def _rows(self, payload):
+        return [copy.deepcopy(r) for r in (payload if isinstance(payload, list) else [payload])]
+
+    def _insert(self, t, q):
+        rows = self._rows(q.payload)
+        for r in rows:
+            key = t.key_of(r)
+            if t.pk and key in t.rows: raise LocalDBError(f"duplicate key in {t.name}: {key}")
+            t.put(key, self._stamp(t, r))
+        return Result(copy.deepcopy(rows))
+
+    def _upsert(self, t, q):
+        cols = tuple(c.strip() for c in q.on_conflict.split(",")) if q.on_conflict else t.pk
+        out = []
+        for r in self._rows(q.payload):
+            key = t.key_of(r)
+            if cols and cols != t.pk:
+                hit = [k for k, x in t.rows.items() if all(x.get(c) == r.get(c) for c in cols)]
+                key = hit[0] if hit else key
+            # 기존 행에는 보낸 컬럼만 덮어쓴다 (PostgREST merge-duplicates 와 같음)
+            new = self._stamp(t, {**t.rows.get(key, {}), **r})
+            t.put(key, new)
+            out.append(new)
+        return Result(copy.deepcopy(out))
+
+    def _update(self, t, q):
+        out = []
+        for key, row in self._match(t, q):
+            new = self._stamp(t, {**row, **copy.deepcopy(q.payload)})
+            new_key = t.key_of(new) if t.pk else key
+            if new_key != key:
+                if new_key in t.rows: raise LocalDBError(f"duplicate key in {t.name}: {new_key}")
+                t.pop(key)
+            t.put(new_key, new)
+            out.append(new)
+        return Result(copy.deepcopy(out))
+
+    def _delete(self, t, q):
+        return Result([t.pop(key) for key, _ in self._match(t, q)])
+
+def from_env(upstream=None, env=os.environ):
+    # LOCAL_DB_LATENCY_MS / LOCAL_DB_JITTER_MS: 호출당 지연, LOCAL_DB_SEED: 초기 데이터 JSON ({테이블: [행, ...]})
+    db = LocalDB(latency=float(env.get("LOCAL_DB_LATENCY_MS", 0)) / 1000,
+                 jitter=float(env.get("LOCAL_DB_JITTER_MS", 0)) / 1000, upstream=upstream)
+    if env.get("LOCAL_DB_SEED"): db.load_json(env["LOCAL_DB_SEED"])
+    return db
@@ -0,0 +1,151 @@
+# ==========================================
+# 성능 계측 (DB 호출 / 페이지 / 탭)
+# ==========================================
+# PERF=1 로 실행하면 켜진다. 꺼져 있으면 클라이언트를 감싸지 않고 기록도 하지 않는다.
+# - instrument(client): table().select()...execute() 마다 (테이블, 동작, 행 수, 시간)을 남긴다.
+# - begin/end, timed: 페이지나 탭 한 번 그리는 시간과 그 안에서 일어난 DB 왕복 수를 남긴다.
+#   스레드 풀로 넘긴 작업도 같은 구간에 잡히도록 현재 구간은 ContextVar 로 들고 다닌다
+#   (fetch.iter_rows 처럼 contextvars.copy_context().run 으로 넘기면 된다).
+# 지표별로 최근 SAMPLE_WINDOW 개 표본만 들고 p50/p95/p99 를 낸다.
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+ENABLED = os.environ.get("PERF") == "1"
+SAMPLE_WINDOW = 5000   # 지표별 표본 수
+EVENT_WINDOW = 50000   # JSONL 로 내보낼 최근 이벤트 수
+QUERY_OPS = ("select", "insert", "upsert", "update", "delete")
+
+class Recorder:
+    def __init__(self, window=SAMPLE_WINDOW, events=EVENT_WINDOW):
+        self.window = window
+        self._samples = {}   # (종류, 이름) -> deque[(ms, 행 수, DB 호출 수)]
+        self._totals = {}    # (종류, 이름) -> [횟수, 행 수, DB 호출 수]
+        self._events = deque(maxlen=events)
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, ms, rows=0, calls=0):
+        with self._lock:
+            key = (kind, name)
+            buf = self._samples.get(key)
+            if buf is None: buf = self._samples[key] = deque(maxlen=self.window)
+            buf.append((ms, rows, calls))
+            tot = self._totals.setdefault(key, [0, 0, 0])
+            tot[0] += 1; tot[1] += rows; tot[2] += calls
+            self._events.append({"ts": time.time(), "kind": kind, "name": name, "ms": round(ms, 3), "rows": rows, "calls": calls})
+
+    def summary(self):
+        with self._lock:
+            items = [(k, np.array(buf, dtype=np.float64), list(self._totals[k])) for k, buf in self._samples.items()]
+        out = []
+        for (kind, name), arr, (n, rows, calls) in sorted(items, key=lambda x: x[0]):
+            p50, p95, p99 = np.percentile(arr[:, 0], [50, 95, 99])
+            row = {"종류": kind, "이름": name, "횟수": n, "p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2),
+                   "최대_ms": round(float(arr[:, 0].max()), 2), "합계_ms": round(float(arr[:, 0].sum()), 1), "행": rows}
+            # 페이지/탭은 한 번 그릴 때의 DB 왕복 수 (중앙값/p95)
+            if kind != "db": row["왕복/회"], row["왕복 p95"] = float(np.median(arr[:, 2])), float(np.percentile(arr[:, 2], 95))
+            out.append(row)
+        return out
+
+    def jsonl(self):
+        with self._lock:
+            return "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in self._events)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear(); self._totals.clear(); self._events.clear()
+
+RECORDER = Recorder()
+
+# ----------------------------------
+# 구간 (페이지 / 탭)
+# ----------------------------------
+_scope = contextvars.ContextVar("perf_scope", default=None)
+_count_lock = threading.Lock()  # copy_context 로 넘긴 풀 스레드들이 같은 Scope 를 함께 센다
+
+class Scope:
+    __slots__ = ("kind", "name", "t0", "calls", "rows", "parent", "token")
+
+    def __init__(self, kind, name, parent):
+        self.kind, self.name, self.parent = kind, name, parent
+        self.calls = self.rows = 0
+        self.t0 = time.perf_counter()
+        self.token = None
+
+def begin(kind, name):
+    # 페이지는 항상 맨 바깥 구간 (st.rerun 등으로 끝나지 못한 이전 구간을 부모로 잡지 않게)
+    sc = Scope(kind, name, _scope.get() if ENABLED and kind != "page" else None)
+    if ENABLED: sc.token = _scope.set(sc)
+    return sc
+
+def end(sc):
+    # 걸린 시간(ms)을 돌려준다. 꺼져 있으면 기록만 하지 않는다.
+    ms = (time.perf_counter() - sc.t0) * 1000
+    if ENABLED and sc.token is not None:
+        _scope.reset(sc.token); sc.token = None
+        with _count_lock: rows, calls = sc.rows, sc.calls
+        RECORDER.record(sc.kind, sc.name, ms, rows, calls)
+    return ms
+
+def timed(kind, name):
+    # name 은 문자열이나 (함수 인자 -> 이름) 함수
+    def deco(fn):
+        if not ENABLED: return fn
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            sc = begin(kind, name(*args, **kwargs) if callable(name) else name)
+            try: return fn(*args, **kwargs)
+            finally: end(sc)
+        return wrapper
+    return deco
+
+def _count(rows):
+    sc = _scope.get()
+    with _count_lock:
+        while sc is not None:
+            sc.calls += 1; sc.rows += rows
+            sc = sc.parent
+
+# ----------------------------------
+# DB 클라이언트 래퍼
+# ----------------------------------
+class _Query:
+    __slots__ = ("_q", "_table", "_op")
+
+    def __init__(self, q, table, op="select"):
+        self._q, self._table, self._op = q, table, op
+
+    def __getattr__(self, attr):
+        target = getattr(self._q, attr)
+        if not callable(target): return target
+        op = attr if attr in QUERY_OPS else self._op
+        def call(*args, **kwargs):
+            return _Query(target(*args, **kwargs), self._table, op)
+        return call
+
+    def execute(self):
+        t0 = time.perf_counter()
+        res = self._q.execute()
+        rows = len(res.data) if isinstance(getattr(res, "data", None), list) else 0
+        RECORDER.record("db", f"{self._table}.{self._op}", (time.perf_counter() - t0) * 1000, rows, 1)
+        _count(rows)
+        return res
+
+class InstrumentedClient:
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return _Query(self._client.table(name), name)
+
+    def __getattr__(self, attr):
+        return getattr(self._client, attr)
+
+def instrument(client):
+    return InstrumentedClient(client) if ENABLED and client is not None else client
@@ -0,0 +1,177 @@
+# ==========================================
+# 제출 스냅샷 캐시 (프로세스 공용)
+# ==========================================
+# (과목, 회차)별 submissions 조회 결과를 모든 세션이 공유한다.
+# TTL이 지나면 updated_at 워터마크 이후에 바뀐 행만 받아 합치고(delta sync),
+# RECONCILE_SEC 마다 한 번은 전체를 다시 읽어 삭제된 행까지 맞춘다.
+# updated_at 은 DB 가 찍는다 (sql/submissions_updated_at.sql). 앱은 보내지 않으므로 워터마크는 DB 시계만 따른다.
+# 과목 수가 많아지면 오래 안 쓴 항목부터 버린다.
+# client 는 supabase Client 또는 같은 체인을 흉내 내는 대역이면 된다 (app.py 는 이 캐시를 st.cache_resource 로 한 벌만 둔다).
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import aggregates
+from engine import RankIndex, term_key
+from fetch import fetch_all
+
+SNAPSHOT_TTL = 30
+SNAPSHOT_MAX = 64
+SNAPSHOT_FIELDS = ("username", "total", "prev_grade", "mid_score", "perf_score")
+SNAPSHOT_COLS = ", ".join(SNAPSHOT_FIELDS)
+SYNC_COL = "updated_at"
+RECONCILE_SEC = 600
+
+def parse_ts(v):
+    return datetime.fromisoformat(v.replace("Z", "+00:00")) if v else None
+
+class SnapshotCache:
+    def __init__(self, ttl=SNAPSHOT_TTL, max_entries=SNAPSHOT_MAX):
+        self.ttl, self.max_entries = ttl, max_entries
+        self._entries = OrderedDict()  # key -> (만료 시각, 값)
+        self._loading = {}             # key -> 로딩 락 (동시 미스 시 한 번만 조회)
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, refresh=None):
+        # refresh 가 있으면 만료된 값은 버리지 않고 refresh(이전 값)으로 갱신한다
+        with self._lock:
+            hit = self._lookup(key)
+            if hit is not None: return hit
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                hit = self._lookup(key)
+                if hit is not None: return hit
+                stale = self._entries.get(key)
+            value = refresh(stale[1]) if refresh is not None and stale is not None else loader()
+            self.put(key, value)
+            with self._lock:
+                self._loading.pop(key, None)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, key):
+        # 만료된 항목은 None 이지만 지우지 않는다 (refresh 의 재료, 개수는 LRU 로 제한)
+        ent = self._entries.get(key)
+        if ent is None or ent[0] < time.monotonic(): return None
+        self._entries.move_to_end(key)
+        return ent[1]
+
+    def peek(self, key):
+        with self._lock:
+            return self._lookup(key)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None: self._entries.clear()
+            else: self._entries.pop(key, None)
+
+    def expire(self, keys):
+        # 다음 조회 때 이 키들만 갱신하게 한다 (스냅샷은 delta sync). 다른 세션이 보는 항목은 그대로 둔다
+        with self._lock:
+            for key in keys:
+                ent = self._entries.get(key)
+                if ent is not None: self._entries[key] = (0, ent[1])
+
+# (과목, 회차) 하나의 제출 현황. 이 프로세스에서 쓴 변경은 다시 읽지 않고 바로 반영한다.
+# 점수/석차 인덱스/직전 등급별 집계를 같이 들고 있어서, 바뀐 행만 합쳐도 셋이 함께 맞춰진다.
+# 앱에는 제출을 지우는 경로가 없다. DB 에서 지워진 행은 RECONCILE_SEC 마다 하는 전체 재조회 때 빠진다.
+# version 은 내용이 바뀔 때마다 새로 받는 프로세스 내 고유 번호 (새로 읽은 스냅샷도 겹치지 않음)
+_snapshot_versions = itertools.count(1)
+
+class SubmissionSnapshot:
+    def __init__(self, rows):
+        self.rows = {r['username']: r for r in rows}
+        self.ranks = RankIndex(r['total'] for r in self.rows.values() if r.get('total') is not None)
+        self.term_ranks = RankIndex(k for k in map(term_key, self.rows.values()) if k is not None)
+        self.aggs = aggregates.compute_aggregates(self.rows.values())
+        # 워터마크는 DB 에서 읽은 행으로만 올린다 (내가 쓴 행으로 올리면 그 사이 남이 쓴 행을 놓친다)
+        self.watermark = max(filter(None, (parse_ts(r.get(SYNC_COL)) for r in self.rows.values())), default=None)
+        self.loaded_at = time.monotonic()
+        self.version = next(_snapshot_versions)
+        self._lock = threading.Lock()
+
+    def sync(self, rows):
+        # 워터마크 경계에서 다시 받은 같은 행은 건너뛴다 (version 이 괜히 바뀌지 않게)
+        with self._lock:
+            for r in rows:
+                old = self.rows.get(r['username'], {})
+                new = {**old, **r}
+                if new != old: self._apply(r['username'], old, new)
+                ts = parse_ts(r.get(SYNC_COL))
+                if ts and (self.watermark is None or ts > self.watermark): self.watermark = ts
+
+    def merge(self, username, fields):
+        # 이 프로세스에서 쓴 변경: 스냅샷에 없는 컬럼(marks 등)만 바뀌었어도 version 은 올린다
+        with self._lock:
+            old = self.rows.get(username, {})
+            self._apply(username, old, {**old, **fields, "username": username})
+
+    def _apply(self, username, old, new):
+        self._reindex(old, new)
+        self.rows[username] = new
+        self.version = next(_snapshot_versions)
+
+    def _reindex(self, old, new):
+        self.ranks.replace(old.get('total'), new.get('total'))
+        self.term_ranks.replace(term_key(old), term_key(new))
+        aggregates.apply_delta(self.aggs, old, new)
+
+    def values(self):
+        with self._lock:
+            return list(self.rows.values())
+
+    def row(self, username):
+        with self._lock:
+            r = self.rows.get(username)
+            return dict(r) if r else None
+
+    def rank(self, score):
+        with self._lock:
+            return self.ranks.rank(score)
+
+    def term_rank(self, score):
+        with self._lock:
+            return self.term_ranks.rank(score)
+
+    def aggregates(self):
+        with self._lock:
+            return dict(self.aggs)
+
+# ----------------------------------
+# DB 입출력 (delta sync)
+# ----------------------------------
+def new_sync_state():
+    # updated_at 컬럼이 없다고 확인되면 missing_until(monotonic)까지는 그 컬럼 없이 읽는다
+    return {"missing_until": 0.0}
+
+def is_missing_column(e, col):
+    # PostgREST: 42703 (undefined_column), PGRST204 (스키마 캐시에 없는 컬럼)
+    return getattr(e, "code", None) in ("42703", "PGRST204") or col in str(e)
+
+def fetch_snapshot_rows(client, sub_name, round_num, state, since=None):
+    # 마이그레이션 전 DB 에서는 updated_at 없이 읽는다 -> 워터마크가 없으니 갱신할 때마다 전체를 다시 읽는다
+    filters = {"subject": sub_name, "round": round_num}
+    if time.monotonic() >= state["missing_until"]:
+        try: return fetch_all(client, "submissions", f"{SNAPSHOT_COLS}, {SYNC_COL}", filters, since=since)
+        except Exception as e:
+            if not is_missing_column(e, SYNC_COL): raise
+            state["missing_until"] = time.monotonic() + RECONCILE_SEC
+    return fetch_all(client, "submissions", SNAPSHOT_COLS, filters)
+
+def load_snapshot(client, sub_name, round_num, state):
+    return SubmissionSnapshot(fetch_snapshot_rows(client, sub_name, round_num, state))
+
+def refresh_snapshot(client, snap, sub_name, round_num, state):
+    # 워터마크 이후(같은 시각 포함)에 바뀐 행만 받아 합친다 (워터마크가 없거나 재조정 주기가 되면 전체)
+    if snap.watermark is None or time.monotonic() - snap.loaded_at > RECONCILE_SEC: return load_snapshot(client, sub_name, round_num, state)
+    snap.sync(fetch_snapshot_rows(client, sub_name, round_num, state, since=(SYNC_COL, snap.watermark.isoformat())))
+    return snap
@@ -0,0 +1,76 @@
+# ==========================================
+# 회차별 결과 스냅샷 (round_snapshots / round_results 테이블)
+# ==========================================
+# 채점 종료나 새 시험 시작 때 그 회차의 결과를 한 번 계산해 얼려 둔다.
+# - round_snapshots: (subject, round) -> 최종 실시간/호머 컷, 학기말 컷, 인원
+# - round_results:   (username, subject, round) -> 점수, 예측 등급, 석차, 학기말 석차, 확정 등급
+# 지난 회차 성적표는 round_results 를 (username, round) 로 한 번 읽기만 하면 되고
+# submissions 를 다시 훑거나 등급컷을 다시 계산하지 않는다.
+from datetime import datetime, timezone
+
+import numpy as np
+
+import engine
+from fetch import fetch_all
+
+SNAP_TABLE = "round_snapshots"
+RESULT_TABLE = "round_results"
+WRITE_BATCH = 500
+
+def _ranks(values):
+    # None 은 석차에서 빼고, 나머지는 (석차, 동점자 수, 인원)
+    idx = [i for i, v in enumerate(values) if v is not None]
+    out = [(None, None, None)] * len(values)
+    if not idx: return out
+    rank, tied = engine.rank_array(np.array([values[i] for i in idx], dtype=np.float64))
+    for j, i in enumerate(idx): out[i] = (int(rank[j]), int(tied[j]), len(idx))
+    return out
+
+def freeze_subject(sub_name, round_num, rows, d):
+    # 한 과목의 제출 행들 -> (round_snapshots 행, round_results 행 목록)
+    scored = [r for r in rows if r.get('total') is not None]
+    aggs = engine.aggregate_scores(np.array([r['total'] for r in scored], dtype=np.float64),
+                                   np.array([r.get('prev_grade') or 0 for r in scored], dtype=np.int64))
+    raw, homer, cnt, is_h = engine.predict_cuts(d, aggs)
+    target = homer if is_h else raw
+    term_cuts = engine.predict_term_cuts(d, target)
+    snap = {"subject": sub_name, "round": round_num, "raw_cuts": raw, "homer_cuts": homer, "is_homer": is_h,
+            "term_cuts": term_cuts, "cnt": cnt, "frozen_at": datetime.now(timezone.utc).isoformat()}
+
+    terms = [engine.term_key(r) for r in rows]
+    ranks, term_ranks = _ranks([r.get('total') for r in rows]), _ranks(terms)
+    results = []
+    for r, t, (rk, tied, n), (t_rk, _, t_n) in zip(rows, terms, ranks, term_ranks):
+        results.append({"username": r['username'], "subject": sub_name, "round": round_num,
+                        "total": r.get('total'), "grade": engine.grade_for(r['total'], target) if r.get('total') is not None else None,
+                        "rank": rk, "tied": tied, "n": n, "term_score": t, "term_rank": t_rk, "term_n": t_n,
+                        "final_grade": r.get('final_grade')})
+    return snap, results
+
+def materialize_round(client, round_num, get_settings):
+    # 회차 전체를 한 번 읽어 과목별로 얼린다. get_settings(과목) -> 그 회차 과목 설정
+    rows = fetch_all(client, "submissions", "username, subject, total, prev_grade, mid_score, perf_score, final_grade",
+                     {"round": round_num}, order=("subject", "username"))
+    by_sub = {}
+    for r in rows: by_sub.setdefault(r['subject'], []).append(r)
+    snaps, results = [], []
+    for sub_name, sub_rows in by_sub.items():
+        snap, res = freeze_subject(sub_name, round_num, sub_rows, get_settings(sub_name))
+        snaps.append(snap); results.extend(res)
+    if snaps: client.table(SNAP_TABLE).upsert(snaps, on_conflict="subject,round").execute()
+    for i in range(0, len(results), WRITE_BATCH):
+        client.table(RESULT_TABLE).upsert(results[i:i + WRITE_BATCH], on_conflict="username,subject,round").execute()
+    return len(snaps), len(results)
+
+def load_results(client, username, round_num):
+    # 얼려 둔 회차가 아니면 빈 목록. 성적표는 실시간 화면과 같은 칸(점수, 등급)만 보여준다
+    return client.table(RESULT_TABLE).select("subject, total, grade, final_grade").eq("username", username).eq("round", round_num).execute().data
+
+def record_final_grades(client, username, round_num, new_pg):
+    # 확정 등급은 얼린 뒤에도 들어오므로 결과 행에 바로 합친다 (submissions 와 같은 upsert)
+    # 얼려 둔 과목에만 쓴다. 안 얼린 회차에 final_grade 만 있는 행이 생기면 성적표가 그 회차를 얼린 것으로 보고
+    # 나머지 과목의 실시간 예측을 빠뜨린다 (그런 회차는 나중에 얼릴 때 submissions 의 확정 등급을 같이 읽는다)
+    if not new_pg: return
+    frozen = {r['subject'] for r in client.table(SNAP_TABLE).select("subject").eq("round", round_num).in_("subject", list(new_pg)).execute().data}
+    rows = [{"username": username, "subject": sub, "round": round_num, "final_grade": grade} for sub, grade in new_pg.items() if sub in frozen]
+    if rows: client.table(RESULT_TABLE).upsert(rows, on_conflict="username,subject,round").execute()
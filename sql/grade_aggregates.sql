@@ -0,0 +1,19 @@
+-- ==========================================
+-- grade_aggregates (직전 등급별 점수 집계)
+-- ==========================================
+-- (subject, round, prev_grade) -> total_sum, total_cnt. aggregates.py 가 제출마다 delta 로 갱신한다.
+-- 이 테이블이 없으면 제출 때마다 집계 저장이 실패하고, 등급컷 예측은 과목마다 submissions 를 전부 다시 읽는다.
+-- Supabase SQL Editor 에서 한 번 실행하면 된다 (여러 번 실행해도 같은 결과).
+
+create table if not exists grade_aggregates (
+    subject    text             not null,
+    round      integer          not null,
+    prev_grade integer          not null check (prev_grade between 1 and 5),
+    total_sum  double precision not null default 0,
+    total_cnt  integer          not null default 0,
+    -- upsert(on_conflict="subject,round,prev_grade") 의 기준
+    primary key (subject, round, prev_grade)
+);
+
+-- 성적표: subject in (...) and round = ?
+create index if not exists grade_aggregates_round on grade_aggregates (round, subject);
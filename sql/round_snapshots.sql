@@ -0,0 +1,43 @@
+-- ==========================================
+-- round_snapshots / round_results (회차별 결과 스냅샷)
+-- ==========================================
+-- 채점 종료나 새 시험 시작 때 snapshots.materialize_round 가 채운다.
+-- 이 테이블이 없으면 회차를 얼릴 수 없고, 지난 회차 성적표는 submissions 로 실시간 계산한다.
+-- Supabase SQL Editor 에서 한 번 실행하면 된다 (여러 번 실행해도 같은 결과).
+
+-- (subject, round) -> 최종 실시간/호머 컷, 학기말 컷, 인원
+create table if not exists round_snapshots (
+    subject    text        not null,
+    round      integer     not null,
+    raw_cuts   jsonb       not null,
+    homer_cuts jsonb       not null,
+    is_homer   boolean     not null default false,
+    term_cuts  jsonb       not null,
+    cnt        integer     not null default 0,
+    frozen_at  timestamptz not null default now(),
+    -- upsert(on_conflict="subject,round") 의 기준
+    primary key (subject, round)
+);
+
+create index if not exists round_snapshots_round on round_snapshots (round);
+
+-- (username, subject, round) -> 점수, 예측 등급, 석차, 학기말 석차, 확정 등급
+create table if not exists round_results (
+    username    text             not null,
+    subject     text             not null,
+    round       integer          not null,
+    total       double precision,
+    grade       text,
+    rank        integer,
+    tied        integer,
+    n           integer,
+    term_score  double precision,
+    term_rank   integer,
+    term_n      integer,
+    final_grade integer,
+    -- upsert(on_conflict="username,subject,round") 의 기준
+    primary key (username, subject, round)
+);
+
+-- 성적표 조회(username = ? and round = ?)는 기본 키로 충분하다. 회차 단위 조회용:
+create index if not exists round_results_round on round_results (round, subject);
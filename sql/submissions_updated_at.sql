@@ -0,0 +1,25 @@
+-- ==========================================
+-- submissions.updated_at (제출 스냅샷 delta sync 워터마크)
+-- ==========================================
+-- 행이 들어오거나 바뀔 때마다 DB 가 시각을 찍는다. 앱은 이 컬럼을 보내지 않는다.
+-- 이 파일을 실행하기 전에는 앱이 컬럼이 없는 것을 알아채고 스냅샷을 매번 전체로 다시 읽는다.
+-- Supabase SQL Editor 에서 한 번 실행하면 된다 (여러 번 실행해도 같은 결과).
+
+alter table submissions add column if not exists updated_at timestamptz not null default now();
+
+create or replace function submissions_touch_updated_at() returns trigger
+language plpgsql as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+-- upsert 의 on conflict do update 도 before update 트리거를 탄다
+drop trigger if exists submissions_touch_updated_at on submissions;
+create trigger submissions_touch_updated_at
+    before update on submissions
+    for each row execute function submissions_touch_updated_at();
+
+-- delta sync 조회: subject = ? and round = ? and updated_at >= ?
+create index if not exists submissions_subject_round_updated_at on submissions (subject, round, updated_at);
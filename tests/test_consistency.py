@@ -0,0 +1,159 @@
+# ==========================================
+# 집계 / 석차 / 채점 일관성 테스트
+# ==========================================
+# - grade_aggregates: 제출 -> 수정 -> 재채점을 localdb 에서 돌린 뒤 check_aggregates 가 비어 있어야 한다
+#   (폼을 연 뒤 재채점이 들어오거나 두 번 제출해도)
+# - RankIndex: 예전 sorted().index / count 방식과 석차, 동점자 수, 총원이 같아야 한다
+# - score_batch: 건별 score_submission 과 같은 점수여야 한다
+#
+#   python -m pytest -q tests
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import aggregates  # noqa: E402
+import engine  # noqa: E402
+from fetch import fetch_all  # noqa: E402
+from localdb import LocalDB  # noqa: E402
+
+SUB, ROUND = "통합과학", 1
+CONF = engine.SUBJECT_CONFIG[SUB]
+
+def make_settings(rng, conf=CONF):
+    return {"obj_answers": rng.integers(1, 6, conf["obj"]).tolist(),
+            "obj_scores": rng.choice([2.0, 2.5, 3.0, 3.5, 4.0], conf["obj"]).tolist(),
+            "sub_max_scores": [5.0] * conf["sub"]}
+
+def random_answer(rng, conf=CONF):
+    return rng.integers(1, 6, conf["obj"]).tolist(), np.round(rng.random(conf["sub"]) * 5.0, 1).tolist()
+
+# ----------------------------------
+# 예전 방식 (submissions 전체를 정렬해서 index / count)
+# ----------------------------------
+def old_rank(scores, my_score):
+    scores = sorted((s for s in scores if s is not None), reverse=True)
+    try: return scores.index(my_score) + 1, scores.count(my_score), len(scores)
+    except ValueError: return 0, 0, len(scores)
+
+def old_term_score(r):
+    return round((r['total'] * 0.3) + (r['mid_score'] * 0.3) + r['perf_score'], 2)
+
+# ----------------------------------
+# 제출 / 재채점 (app.py 의 submit_answers / regrade_submissions 와 같은 순서)
+# ----------------------------------
+def submit(db, d, username, prev_grade, marks, sub_vals):
+    new = {"username": username, "subject": SUB, "round": ROUND, "total": engine.score_submission(marks, sub_vals, d),
+           "prev_grade": prev_grade, "marks": marks, "sub_vals": sub_vals}
+    return aggregates.write_submission(db, new)
+
+def regrade(db, d):
+    rows = fetch_all(db, "submissions", "username, total, marks, sub_vals", {"subject": SUB, "round": ROUND})
+    marks = engine.pack_matrix((r['marks'] for r in rows), CONF["obj"], np.uint8)
+    sub_vals = engine.pack_matrix((r['sub_vals'] for r in rows), CONF["sub"], np.float64)
+    new_total = engine.score_batch(marks, sub_vals, d)
+    updates = [{"username": r['username'], "subject": SUB, "round": ROUND, "total": float(t)}
+               for r, t in zip(rows, new_total) if not np.isclose(t, r['total'])]
+    if updates: db.table("submissions").upsert(updates, on_conflict="username,subject,round").execute()
+    aggregates.rebuild_aggregates(db, SUB, ROUND)
+    return len(updates)
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(7)
+
+# ----------------------------------
+# 집계
+# ----------------------------------
+def test_aggregates_consistent_through_submit_edit_regrade(rng):
+    db, d = LocalDB(), make_settings(rng)
+    users = [(f"u{i}", int(rng.integers(1, 6))) for i in range(60)]
+    for u, pg in users: submit(db, d, u, pg, *random_answer(rng))
+    assert aggregates.check_aggregates(db, SUB, ROUND) == {}
+
+    for u, pg in users[::3]: submit(db, d, u, pg, *random_answer(rng))
+    assert aggregates.check_aggregates(db, SUB, ROUND) == {}
+
+    d["obj_answers"] = [(a % 5) + 1 for a in d["obj_answers"]]
+    assert regrade(db, d) > 0
+    assert aggregates.check_aggregates(db, SUB, ROUND) == {}
+
+    # 재채점 뒤에 들어온 수정도 delta 로 맞아야 한다
+    for u, pg in users[1::4]: submit(db, d, u, pg, *random_answer(rng))
+    assert aggregates.check_aggregates(db, SUB, ROUND) == {}
+
+    stored = aggregates.load_aggregates(db, SUB, ROUND)
+    rows = fetch_all(db, "submissions", "total, prev_grade", {"subject": SUB, "round": ROUND})
+    assert sum(c for _, c in stored.values()) == len(rows) == len(users)
+
+def test_submit_after_regrade_uses_stored_row(rng):
+    # 폼을 그린 뒤(그때의 행) 재채점이 들어오고, 같은 답안을 두 번 제출해도 집계가 어긋나지 않아야 한다
+    db, d = LocalDB(), make_settings(rng)
+    for i in range(20): submit(db, d, f"u{i}", 1 + i % 5, *random_answer(rng))
+    rendered = db.table("submissions").select("*").eq("username", "u0").eq("subject", SUB).eq("round", ROUND).execute().data[0]
+    d["obj_answers"] = [(a % 5) + 1 for a in d["obj_answers"]]
+    regrade(db, d)
+    regraded = engine.score_submission(rendered['marks'], rendered['sub_vals'], d)
+    assert regraded != rendered['total']
+    marks, sub_vals = random_answer(rng)
+    old, _ = submit(db, d, "u0", 1, marks, sub_vals)
+    assert old['total'] == regraded
+    submit(db, d, "u0", 1, marks, sub_vals)
+    assert aggregates.check_aggregates(db, SUB, ROUND) == {}
+
+def test_check_aggregates_reports_drift(rng):
+    db, d = LocalDB(), make_settings(rng)
+    for i in range(10): submit(db, d, f"u{i}", 1 + i % 5, *random_answer(rng))
+    db.table(aggregates.AGG_TABLE).update({"total_cnt": 99}).eq("subject", SUB).eq("round", ROUND).eq("prev_grade", 3).execute()
+    assert list(aggregates.check_aggregates(db, SUB, ROUND)) == [3]
+    aggregates.rebuild_aggregates(db, SUB, ROUND)
+    assert aggregates.check_aggregates(db, SUB, ROUND) == {}
+
+# ----------------------------------
+# 석차
+# ----------------------------------
+def test_rank_index_matches_sorted_index_count():
+    r = random.Random(3)
+    scores = [float(r.randint(0, 40)) for _ in range(300)] + [None] * 5
+    idx = engine.RankIndex(s for s in scores if s is not None)
+    for v in range(-1, 42): assert idx.rank(float(v)) == old_rank(scores, float(v))
+    assert idx.rank(None) == old_rank(scores, None)
+
+    # 제출 / 수정 / 삭제를 하나씩 반영해도 다시 만든 것과 같아야 한다
+    for _ in range(500):
+        i = r.randrange(len(scores))
+        new = r.choice([None, float(r.randint(0, 40))])
+        idx.replace(scores[i], new); scores[i] = new
+        probe = float(r.randint(0, 40))
+        assert idx.rank(probe) == old_rank(scores, probe)
+    assert len(idx) == sum(s is not None for s in scores)
+
+def test_term_rank_matches_old_logic():
+    r = random.Random(5)
+    rows = [{"total": float(r.randint(0, 100)), "mid_score": float(r.randint(0, 100)), "perf_score": float(r.randint(0, 40))} for _ in range(200)]
+    rows += [{"total": 50.0, "mid_score": None, "perf_score": None}]
+    assert [engine.term_key(x) for x in rows[:-1]] == [old_term_score(x) for x in rows[:-1]] and engine.term_key(rows[-1]) is None
+    idx = engine.RankIndex(k for k in map(engine.term_key, rows) if k is not None)
+    old_scores = [old_term_score(x) for x in rows[:-1]]
+    for x in rows[:-1]: assert idx.rank(engine.term_key(x)) == old_rank(old_scores, old_term_score(x))
+
+def test_rank_array_matches_rank_index(rng):
+    values = rng.integers(0, 30, 500).astype(np.float64)
+    rank, tied = engine.rank_array(values)
+    idx = engine.RankIndex(values.tolist())
+    assert [(int(a), int(b), len(values)) for a, b in zip(rank, tied)] == [idx.rank(v) for v in values.tolist()]
+
+# ----------------------------------
+# 채점
+# ----------------------------------
+@pytest.mark.parametrize("sub", ["통합과학", "한국사", "국어(1학년)"])
+def test_score_batch_matches_score_submission(rng, sub):
+    conf = engine.SUBJECT_CONFIG[sub]
+    d = make_settings(rng, conf)
+    answers = [random_answer(rng, conf) for _ in range(500)]
+    marks = engine.pack_matrix((m for m, _ in answers), conf["obj"], np.uint8)
+    sub_vals = engine.pack_matrix((s for _, s in answers), conf["sub"], np.float64)
+    assert engine.score_batch(marks, sub_vals, d).tolist() == [engine.score_submission(m, s, d) for m, s in answers]
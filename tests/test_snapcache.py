@@ -0,0 +1,57 @@
+# ==========================================
+# 제출 스냅샷 delta sync 테스트 (localdb)
+# ==========================================
+# - 다른 프로세스(여기서는 스냅샷을 거치지 않은 쓰기)가 쓴 행은 다음 갱신 때 워터마크 이후 delta 로 들어와야 한다
+# - 워터마크와 같은 시각의 행을 다시 받아도 version 이 바뀌지 않아야 한다
+# - 이 프로세스에서 쓴 merge 는 워터마크를 올리지 않아야 한다 (그 사이 남이 쓴 행을 놓치지 않게)
+#
+#   python -m pytest -q tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import snapcache  # noqa: E402
+from localdb import LocalDB  # noqa: E402
+
+SUB, ROUND = "통합과학", 1
+
+def write(db, username, total, prev_grade=3):
+    db.table("submissions").upsert({"username": username, "subject": SUB, "round": ROUND, "total": total, "prev_grade": prev_grade}).execute()
+
+def setup():
+    db, state = LocalDB(), snapcache.new_sync_state()
+    for i in range(5): write(db, f"u{i}", 50.0 + i)
+    return db, state, snapcache.load_snapshot(db, SUB, ROUND, state)
+
+def refresh(db, state, snap):
+    return snapcache.refresh_snapshot(db, snap, SUB, ROUND, state)
+
+def test_delta_picks_up_other_writer():
+    db, state, snap = setup()
+    mark, version = snap.watermark, snap.version
+    write(db, "other", 99.0, 1)
+    write(db, "u0", 10.0)
+    assert refresh(db, state, snap) is snap
+    assert snap.row("other")['total'] == 99.0 and snap.row("u0")['total'] == 10.0
+    assert snap.watermark > mark and snap.version != version
+    assert snap.rank(99.0) == (1, 1, 6)
+    assert snap.aggregates() == snapcache.load_snapshot(db, SUB, ROUND, state).aggregates()
+
+def test_boundary_reread_keeps_version():
+    db, state, snap = setup()
+    mark, version = snap.watermark, snap.version
+    # gte 라서 워터마크 시각의 행은 매번 다시 온다
+    assert snapcache.fetch_snapshot_rows(db, SUB, ROUND, state, since=(snapcache.SYNC_COL, mark.isoformat()))
+    for _ in range(3): refresh(db, state, snap)
+    assert snap.watermark == mark and snap.version == version
+
+def test_local_merge_does_not_advance_watermark():
+    db, state, snap = setup()
+    mark = snap.watermark
+    write(db, "other", 77.0)                  # 남이 쓴 행 (아직 스냅샷에 없음)
+    write(db, "me", 88.0)
+    snap.merge("me", {"total": 88.0, "prev_grade": 3})
+    assert snap.watermark == mark and snap.row("me")['total'] == 88.0 and snap.row("other") is None
+    refresh(db, state, snap)
+    assert snap.row("other")['total'] == 77.0 and snap.row("me")['total'] == 88.0
+    assert len(snap.values()) == 7